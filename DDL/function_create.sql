@@ -6,8 +6,8 @@ LANGUAGE plpgsql
 AS $$
 BEGIN
     UPDATE word_translate
-    SET success_rate = (
-        SELECT AVG(success_rate)
+    SET (success_rate, success_rate_count, success_rate_sum) = (
+        SELECT AVG(success_rate), COUNT(*), COALESCE(SUM(success_rate), 0)
         FROM word_translate_success_rate
         WHERE word_translate_id = p_word_translate_id
     )
@@ -16,3 +16,113 @@ BEGIN
     RETURN;
 END;
 $$;
+
+CREATE OR REPLACE FUNCTION public.llm_evaluation_cache_prune(
+    p_max_age_seconds integer
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM llm_evaluation_cache
+    WHERE created_at < now() - make_interval(secs => p_max_age_seconds);
+
+    RETURN;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.matching_rating_insert(
+    p_matching_rating_id text,
+    p_click_counter integer,
+    p_language_from text,
+    p_language_to text,
+    p_word_ids text[]
+)
+RETURNS text
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_matching_rating_id text;
+BEGIN
+    INSERT INTO matching_rating (matching_rating_id, click_counter, language_from, language_to)
+    VALUES (coalesce(p_matching_rating_id, gen_random_uuid()::text), p_click_counter, p_language_from, p_language_to)
+    ON CONFLICT (matching_rating_id) DO NOTHING
+    RETURNING matching_rating_id INTO v_matching_rating_id;
+
+    -- ID od klienta už existuje, použije se ID ze serveru
+    IF v_matching_rating_id IS NULL THEN
+        INSERT INTO matching_rating (click_counter, language_from, language_to)
+        VALUES (p_click_counter, p_language_from, p_language_to)
+        RETURNING matching_rating_id INTO v_matching_rating_id;
+    END IF;
+
+    INSERT INTO matching_rating_word (matching_rating_id, word_id)
+    SELECT v_matching_rating_id, word_id
+    FROM unnest(p_word_ids) AS word_id;
+
+    RETURN v_matching_rating_id;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.translate_rating_apply(
+    p_ratings jsonb
+)
+RETURNS TABLE (word_translate_id text, success_rate float)
+LANGUAGE sql
+AS $$
+    WITH ratings AS (
+        SELECT r.word_translate_id, r.success_rate
+        FROM jsonb_to_recordset(p_ratings) AS r(word_translate_id text, success_rate float)
+    ), history AS (
+        INSERT INTO word_translate_success_rate (word_translate_id, success_rate)
+        SELECT ratings.word_translate_id, ratings.success_rate
+        FROM ratings
+    )
+    UPDATE word_translate AS tran
+    SET success_rate_count = tran.success_rate_count + agg.rating_count,
+        success_rate_sum = tran.success_rate_sum + agg.rating_sum,
+        success_rate = (tran.success_rate_sum + agg.rating_sum) / (tran.success_rate_count + agg.rating_count)
+    FROM (
+        SELECT ratings.word_translate_id, COUNT(*) AS rating_count, SUM(ratings.success_rate) AS rating_sum
+        FROM ratings
+        GROUP BY ratings.word_translate_id
+    ) AS agg
+    WHERE tran.word_translate_id = agg.word_translate_id
+    RETURNING tran.word_translate_id, tran.success_rate;
+$$;
+
+CREATE OR REPLACE FUNCTION public.statistics_daily_increment()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO statistics_daily AS stat (date_serial, word_rating_count_by_date, storytelling_story_count_by_date, storytelling_result_count_by_date)
+    SELECT cast(new_rows.created_at AS date),
+        CASE WHEN TG_TABLE_NAME = 'word_translate_success_rate' THEN COUNT(*) ELSE 0 END,
+        CASE WHEN TG_TABLE_NAME = 'storytelling_story' THEN COUNT(*) ELSE 0 END,
+        CASE WHEN TG_TABLE_NAME = 'storytelling_result' THEN COUNT(*) ELSE 0 END
+    FROM new_rows
+    GROUP BY cast(new_rows.created_at AS date)
+    ON CONFLICT (date_serial) DO UPDATE
+    SET word_rating_count_by_date = stat.word_rating_count_by_date + EXCLUDED.word_rating_count_by_date,
+        storytelling_story_count_by_date = stat.storytelling_story_count_by_date + EXCLUDED.storytelling_story_count_by_date,
+        storytelling_result_count_by_date = stat.storytelling_result_count_by_date + EXCLUDED.storytelling_result_count_by_date;
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER word_translate_success_rate_statistics_daily
+AFTER INSERT ON word_translate_success_rate
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION statistics_daily_increment();
+
+CREATE OR REPLACE TRIGGER storytelling_story_statistics_daily
+AFTER INSERT ON storytelling_story
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION statistics_daily_increment();
+
+CREATE OR REPLACE TRIGGER storytelling_result_statistics_daily
+AFTER INSERT ON storytelling_result
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION statistics_daily_increment();
@@ -0,0 +1,81 @@
+-- změny pro existující databázi (nová databáze má vše v table_create.sql)
+
+-- view s created_at slov pro delta refresh cache slovíček (nové sloupce jsou na konci)
+CREATE OR REPLACE VIEW words_all_with_translate
+as
+select 
+con_from.word_id as word_id_from,
+con_from.word_content as word_content_from,
+con_from.word_language as word_language_from,
+con_from.valid as valid_from,
+con_from.note as note_from,
+tran.word_translate_id,
+tran.word_from_id,
+tran.word_to_id,
+tran.valid as translate_valid,
+tran.created_at as translate_created_at,
+tran.note as translate_note,
+tran.success_rate as translate_success_rate,
+con_to.word_id as word_id_to,
+con_to.word_content as word_content_to,
+con_to.word_language as word_language_to,
+con_to.valid as valid_to,
+con_to.note as note_to,
+uuid_generate_v4()::text as random_id,
+con_from.created_at as created_at_from,
+con_to.created_at as created_at_to
+from word_content as con_from
+left join word_translate as tran on con_from.word_id = tran.word_from_id
+left join word_content con_to on tran.word_to_id = con_to.word_id;
+
+-- průběžný počet a součet hodnocení překladu
+alter table public.word_translate add column if not exists success_rate_count integer not null default 0;
+alter table public.word_translate add column if not exists success_rate_sum float not null default 0;
+
+update word_translate as tran
+set success_rate_count = agg.rating_count,
+    success_rate_sum = agg.rating_sum,
+    success_rate = agg.rating_sum / agg.rating_count
+from (
+  select word_translate_id, count(*) as rating_count, sum(success_rate) as rating_sum
+  from word_translate_success_rate
+  group by word_translate_id
+) as agg
+where tran.word_translate_id = agg.word_translate_id;
+
+-- trvalá cache hodnocení od OpenAI (funkce llm_evaluation_cache_prune viz function_create.sql)
+create table if not exists public.llm_evaluation_cache
+(
+  cache_key text not null,
+  kind text not null,
+  model text not null,
+  prompt_version text not null,
+  response jsonb not null,
+  created_at timestamp with time zone not null default now(),
+  constraint llm_evaluation_cache_pkey primary key (cache_key)
+) TABLESPACE pg_default;
+
+-- denní počítadla pro /statistics/weekly (triggery viz function_create.sql)
+create table if not exists public.statistics_daily
+(
+  date_serial date not null,
+  word_rating_count_by_date integer not null default 0,
+  storytelling_story_count_by_date integer not null default 0,
+  storytelling_result_count_by_date integer not null default 0,
+  constraint statistics_daily_pkey primary key (date_serial)
+) TABLESPACE pg_default;
+
+insert into statistics_daily (date_serial, word_rating_count_by_date, storytelling_story_count_by_date, storytelling_result_count_by_date)
+select date_serial, sum(word_rating_count_by_date), sum(storytelling_story_count_by_date), sum(storytelling_result_count_by_date)
+from (
+  select cast(created_at as date) as date_serial, count(*) as word_rating_count_by_date, 0 as storytelling_story_count_by_date, 0 as storytelling_result_count_by_date
+  from word_translate_success_rate group by cast(created_at as date)
+  union all
+  select cast(created_at as date), 0, count(*), 0
+  from storytelling_story group by cast(created_at as date)
+  union all
+  select cast(created_at as date), 0, 0, count(*)
+  from storytelling_result group by cast(created_at as date)
+) as counts
+group by date_serial
+on conflict (date_serial) do nothing;
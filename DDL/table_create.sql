@@ -19,6 +19,8 @@ create table public.word_translate
   created_at timestamp with time zone not null default now(),
   note text null,
   success_rate float null,
+  success_rate_count integer not null default 0,
+  success_rate_sum float not null default 0,
   constraint word_translate_pkey primary key (word_translate_id)
 ) TABLESPACE pg_default;
 
@@ -130,6 +132,28 @@ create table public.tense_check_sentence
 ) TABLESPACE pg_default;
 
 
+create table public.llm_evaluation_cache
+(
+  cache_key text not null,
+  kind text not null,
+  model text not null,
+  prompt_version text not null,
+  response jsonb not null,
+  created_at timestamp with time zone not null default now(),
+  constraint llm_evaluation_cache_pkey primary key (cache_key)
+) TABLESPACE pg_default;
+
+
+create table public.statistics_daily
+(
+  date_serial date not null,
+  word_rating_count_by_date integer not null default 0,
+  storytelling_story_count_by_date integer not null default 0,
+  storytelling_result_count_by_date integer not null default 0,
+  constraint statistics_daily_pkey primary key (date_serial)
+) TABLESPACE pg_default;
+
+
 CREATE OR REPLACE VIEW words_all_with_translate
 as
 select 
@@ -150,7 +174,9 @@ con_to.word_content as word_content_to,
 con_to.word_language as word_language_to,
 con_to.valid as valid_to,
 con_to.note as note_to,
-uuid_generate_v4()::text as random_id
+uuid_generate_v4()::text as random_id,
+con_from.created_at as created_at_from,
+con_to.created_at as created_at_to
 from word_content as con_from
 left join word_translate as tran on con_from.word_id = tran.word_from_id
 left join word_content con_to on tran.word_to_id = con_to.word_id
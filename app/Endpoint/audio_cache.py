@@ -0,0 +1,98 @@
+"""
+In-memory LRU cache of TTS audio from bucket
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class AudioObject(NamedTuple):
+    """
+    Audio file with ETag derived from its content
+    """
+    data: bytes
+    etag: str
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Create audio object, ETag is MD5 of file like in storage
+
+        :param data: Audio bytes
+        """
+        return cls(data, '"' + hashlib.md5(data, usedforsecurity=False).hexdigest() + '"')
+
+
+class AudioCache():
+    """
+    Audio files by tts_path with byte budget and LRU eviction
+    """
+    def __init__(self, max_bytes=AUDIO_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tts_path):
+        """
+        Return AudioObject from cache or None
+
+        :param tts_path: Path in bucket
+        """
+        with self._lock:
+            audio = self._items.get(tts_path)
+            if audio is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(tts_path)
+            self.hits += 1
+            return audio
+
+    def put(self, tts_path, data):
+        """
+        Save audio to cache, least recently used files are evicted over byte budget
+
+        :param tts_path: Path in bucket
+        :param data: Audio bytes
+        :return: AudioObject (also when it is too big for cache)
+        """
+        if not data:
+            return None
+        audio = AudioObject.from_bytes(data)
+        if len(data) > self.max_bytes:
+            return audio
+        with self._lock:
+            old = self._items.pop(tts_path, None)
+            if old is not None:
+                self.size -= len(old.data)
+            self._items[tts_path] = audio
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted.data)
+                self.evictions += 1
+        return audio
+
+    def stats(self):
+        """
+        Return counters of cache
+        """
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+audio_cache = AudioCache()
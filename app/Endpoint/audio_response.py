@@ -0,0 +1,113 @@
+"""
+HTTP response for audio with Range and conditional GET
+"""
+import uuid
+from fastapi.responses import Response, StreamingResponse
+from app.Endpoint.audio_cache import AudioObject
+
+AUDIO_CACHE_CONTROL = "public, max-age=86400"
+
+
+def parse_range(range_header, size):
+    """
+    Parse header Range with one byte range
+
+    :param range_header: Value of header Range
+    :param size: Size of file
+    :return: (start, end) inclusive, None for whole file, False for unsatisfiable range
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    ranges = range_header[len("bytes="):].strip()
+    if "," in ranges:
+        # více rozsahů nepodporujeme, vrátí se celý soubor
+        return None
+    start, _, end = ranges.partition("-")
+    try:
+        if not start:
+            suffix = int(end)
+            if suffix <= 0:
+                return False
+            return (max(size - suffix, 0), size - 1)
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return False
+    return (start, min(end, size - 1))
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Test header If-None-Match against ETag
+
+    :param if_none_match: Value of header If-None-Match
+    :param etag: ETag of file
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def audio_response(audio: AudioObject, range_header=None, if_none_match=None, if_range=None, filename="speech.mp3"):
+    """
+    Return audio as 200, 206 (Range) or 304 (If-None-Match) response
+
+    :param audio: Audio with ETag
+    :param range_header: Value of header Range
+    :param if_none_match: Value of header If-None-Match
+    :param if_range: Value of header If-Range
+    :param filename: File name for Content-Disposition
+    """
+    headers = {
+        "ETag": audio.etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": AUDIO_CACHE_CONTROL,
+        "Content-Disposition": f'inline; filename="{filename}"',
+    }
+    if etag_matches(if_none_match, audio.etag):
+        return Response(status_code=304, headers=headers)
+    size = len(audio.data)
+    byte_range = None
+    if not if_range or if_range == audio.etag:
+        byte_range = parse_range(range_header, size)
+    if byte_range is False:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+    if byte_range is None:
+        return Response(content=audio.data, media_type="audio/mpeg", headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=audio.data[start:end + 1], status_code=206, media_type="audio/mpeg", headers=headers)
+
+
+def audio_bundle_response(items):
+    """
+    Return more audio files in one multipart/mixed response, part name is word ID
+
+    :param items: List of (word_id, AudioObject or "") in order of response
+    """
+    boundary = uuid.uuid4().hex
+    missing = [word_id for word_id, audio in items if not audio]
+
+    def parts():
+        for word_id, audio in items:
+            if not audio:
+                continue
+            yield (
+                f"--{boundary}\r\n"
+                "Content-Type: audio/mpeg\r\n"
+                f'Content-Disposition: inline; name="{word_id}"; filename="{word_id}.mp3"\r\n'
+                f"Content-Length: {len(audio.data)}\r\n"
+                f"ETag: {audio.etag}\r\n\r\n"
+            ).encode("utf-8")
+            yield audio.data
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode("utf-8")
+
+    headers = {"Cache-Control": "no-store"}
+    if missing:
+        headers["X-Missing-Words"] = ",".join(missing)
+    return StreamingResponse(parts(), media_type=f"multipart/mixed; boundary={boundary}", headers=headers)
@@ -1,3 +1,10 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# buckety se za běhu nemění, stačí je načíst jednou
+_buckets = {}
+
 
 
 def supabase_create_bucket(bucket_name, storage_client_service):
@@ -22,14 +29,19 @@ def supabase_create_bucket(bucket_name, storage_client_service):
 
 def supabase_get_bucket(bucket_name, storage_client_service):
     """
-    Return bucket if exists
+    Return bucket if exists, bucket is loaded once per process
     
     :param bucket_name: Name of bucket
     """
+    bucket = _buckets.get(bucket_name)
+    if bucket:
+        return bucket
     bucket = storage_client_service.storage.get_bucket(bucket_name)
     if not bucket:
         supabase_create_bucket(bucket_name, storage_client_service)
         bucket = storage_client_service.storage.get_bucket(bucket_name)
+    if bucket:
+        _buckets[bucket_name] = bucket
     return bucket
 def supabase_file_exists(bucket_name, path: str, storage_client_service) -> bool:
     """
@@ -59,3 +71,25 @@ def upload_file_to_bucket(bucket_server, tts_path, word_tts, storage_client_serv
         },
     )
     return upload_responce
+def upload_file_to_bucket_once(bucket_server, bucket_id, tts_path, word_tts, storage_client_service):
+    """
+    Upload file to bucket, file uploaded meanwhile by other request is not an error
+
+    :param bucket_server: Name bucket server
+    :param bucket_id: Bucket ID
+    :param tts_path: File path in bucket
+    :param word_tts: File bytes
+    :return: True when uploaded, False when file already exists, None when upload failed (logged)
+    """
+    try:
+        upload_file_to_bucket(bucket_server, tts_path, word_tts, storage_client_service)
+        return True
+    except Exception:
+        # soubor už nahrál jiný proces - jiné chyby (oprávnění, síť, velikost) se logují
+        try:
+            if supabase_file_exists(bucket_id, tts_path, storage_client_service):
+                return False
+        except Exception:
+            pass
+        logger.exception("Upload of %s to bucket %s failed", tts_path, bucket_server)
+        return None
@@ -0,0 +1,81 @@
+"""
+Fast encoding of large responses negotiated by header Accept (JSON / MessagePack)
+"""
+import json
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def accept_quality(accept):
+    """
+    Return dict media type -> quality from header Accept
+
+    :param accept: Value of header Accept
+    """
+    qualities = {}
+    for item in (accept or "").split(","):
+        media_type, *parameters = [part.strip() for part in item.split(";")]
+        if not media_type:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[media_type.lower()] = max(quality, qualities.get(media_type.lower(), 0.0))
+    return qualities
+
+
+def negotiate_media_type(accept):
+    """
+    Return media type of response - MessagePack only when client prefers it and msgpack is installed
+
+    :param accept: Value of header Accept
+    """
+    if msgpack is None or not accept:
+        return JSON_MEDIA_TYPE
+    qualities = accept_quality(accept)
+    msgpack_quality = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_quality = max(qualities.get(JSON_MEDIA_TYPE, 0.0), qualities.get("application/*", 0.0), qualities.get("*/*", 0.0))
+    return MSGPACK_MEDIA_TYPE if msgpack_quality > json_quality else JSON_MEDIA_TYPE
+
+
+def encode_content(content, media_type=JSON_MEDIA_TYPE):
+    """
+    Serialize content (plain dict/list) to bytes, orjson when installed
+
+    :param content: Content of response
+    :param media_type: JSON or MessagePack media type
+    """
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(content, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encoded_response(content, accept=None, status_code=200):
+    """
+    Return response encoded by header Accept without response_model validation (trusted internal data)
+
+    :param content: Content of response
+    :param accept: Value of header Accept
+    :param status_code: HTTP status code
+    """
+    media_type = negotiate_media_type(accept)
+    return Response(content=encode_content(content, media_type), status_code=status_code, media_type=media_type, headers={"Vary": "Accept"})
@@ -0,0 +1,149 @@
+"""
+Content-addressed cache of LLM evaluations (memory + table llm_evaluation_cache)
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from app.Endpoint.repository import select_rows, upsert_rows, call_function
+
+EVALUATION_CACHE_TTL_SECONDS = float(os.getenv("EVALUATION_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+EVALUATION_CACHE_MAX_ITEMS = int(os.getenv("EVALUATION_CACHE_MAX_ITEMS", "2000"))
+EVALUATION_CACHE_PRUNE_SECONDS = 3600
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """
+    Normalize text for cache key (unicode NFC, whitespace collapsed)
+
+    :param text: Input text
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+class EvaluationCache():
+    """
+    LLM results by hash of normalized inputs, prompt version and model with TTL and size eviction
+    """
+    def __init__(self, ttl_seconds=EVALUATION_CACHE_TTL_SECONDS, max_items=EVALUATION_CACHE_MAX_ITEMS):
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self.hits_memory = 0
+        self.hits_database = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned_at = time.monotonic()
+
+    def key(self, kind, model, prompt_version, inputs):
+        """
+        Return cache key - SHA-256 of normalized inputs, prompt version and model
+
+        :param kind: Kind of evaluation (e.g. check_sentence)
+        :param model: Model name
+        :param prompt_version: Version of prompt
+        :param inputs: Dict of input texts
+        """
+        normalized = {name: normalize_text(value) for name, value in inputs.items()}
+        content = json.dumps([kind, model, prompt_version, normalized], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _memory_get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            created_at, payload = item
+            if time.time() - created_at >= self.ttl_seconds:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return payload
+
+    def _memory_put(self, key, payload, created_at=None):
+        with self._lock:
+            self._items[key] = (created_at or time.time(), payload)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    async def _database_get(self, key):
+        since = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        try:
+            rows = await select_rows("llm_evaluation_cache", columns="response,created_at", eq={"cache_key": key}, gte={"created_at": since.isoformat()})
+        except Exception:
+            logger.exception("Evaluation cache read failed")
+            return None
+        if not rows:
+            return None
+        self._memory_put(key, rows[0]["response"], datetime.fromisoformat(rows[0]["created_at"]).timestamp())
+        return rows[0]["response"]
+
+    async def _database_put(self, key, kind, model, prompt_version, payload):
+        row = {
+            "cache_key": key,
+            "kind": kind,
+            "model": model,
+            "prompt_version": prompt_version,
+            "response": payload,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        try:
+            await upsert_rows("llm_evaluation_cache", row, on_conflict="cache_key")
+            if time.monotonic() - self._pruned_at >= EVALUATION_CACHE_PRUNE_SECONDS:
+                self._pruned_at = time.monotonic()
+                await call_function("llm_evaluation_cache_prune", {"p_max_age_seconds": int(self.ttl_seconds)})
+        except Exception:
+            logger.exception("Evaluation cache write failed")
+
+    async def get_or_create(self, kind, model, prompt_version, inputs, create, result_type):
+        """
+        Return cached evaluation or call create and save its result
+
+        :param kind: Kind of evaluation (e.g. check_sentence)
+        :param model: Model name
+        :param prompt_version: Version of prompt
+        :param inputs: Dict of input texts
+        :param create: Coroutine function calling LLM
+        :param result_type: Pydantic model of result
+        """
+        key = self.key(kind, model, prompt_version, inputs)
+        payload = self._memory_get(key)
+        if payload is not None:
+            self.hits_memory += 1
+            return result_type.model_validate(payload)
+        payload = await self._database_get(key)
+        if payload is not None:
+            self.hits_database += 1
+            return result_type.model_validate(payload)
+        self.misses += 1
+        result = await create()
+        payload = result.model_dump(mode="json")
+        self._memory_put(key, payload)
+        await self._database_put(key, kind, model, prompt_version, payload)
+        return result
+
+    def stats(self):
+        """
+        Return counters and hit rate of cache
+        """
+        requests = self.hits_memory + self.hits_database + self.misses
+        return {
+            "items": len(self._items),
+            "max_items": self.max_items,
+            "hits_memory": self.hits_memory,
+            "hits_database": self.hits_database,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_memory + self.hits_database) / requests, 4) if requests else None
+        }
+
+
+evaluation_cache = EvaluationCache()
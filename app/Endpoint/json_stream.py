@@ -0,0 +1,87 @@
+"""
+Incremental extraction of string fields from JSON generated token by token
+"""
+
+JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonFieldExtractor():
+    """
+    Return decoded text of top-level string fields as soon as their characters arrive
+    """
+    def __init__(self, fields):
+        self.fields = set(fields)
+        self._depth = 0
+        self._expect_key = False
+        self._in_string = False
+        self._is_key = False
+        self._escape = None
+        self._high_surrogate = None
+        self._key = []
+        self._last_key = None
+
+    def _emit_char(self, char, output):
+        if self._is_key:
+            self._key.append(char)
+        elif self._depth == 1 and self._last_key in self.fields:
+            # řetězce ve vnořených polích/objektech se nevypisují
+            if output and output[-1][0] == self._last_key:
+                output[-1] = (self._last_key, output[-1][1] + char)
+            else:
+                output.append((self._last_key, char))
+
+    def _string_char(self, char, output):
+        if self._escape is not None:
+            if self._escape == "":
+                if char == "u":
+                    self._escape = "u"
+                    return
+                self._escape = None
+                self._emit_char(JSON_ESCAPES.get(char, char), output)
+                return
+            self._escape += char
+            if len(self._escape) < 5:
+                return
+            code = int(self._escape[1:], 16)
+            self._escape = None
+            if 0xD800 <= code < 0xDC00:
+                self._high_surrogate = code
+                return
+            if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            self._emit_char(chr(code), output)
+        elif char == "\\":
+            self._escape = ""
+        elif char == '"':
+            self._in_string = False
+            if self._is_key:
+                self._last_key = "".join(self._key)
+                self._key = []
+        else:
+            self._emit_char(char, output)
+
+    def feed(self, chunk):
+        """
+        Process next part of JSON
+
+        :param chunk: Part of JSON text
+        :return: List of (field, text) decoded from this part
+        """
+        output = []
+        for char in chunk:
+            if self._in_string:
+                self._string_char(char, output)
+            elif char == '"':
+                self._in_string = True
+                self._is_key = self._depth == 1 and self._expect_key
+            elif char in "{[":
+                self._depth += 1
+                self._expect_key = char == "{" and self._depth == 1
+            elif char in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and char == ",":
+                self._expect_key = True
+            elif self._depth == 1 and char == ":":
+                self._expect_key = False
+        return output
@@ -1,5 +1,6 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import os
+import threading
 from typing import List, Literal
 from pydantic import BaseModel, Field
 
@@ -37,34 +38,79 @@ class TransformationFeedback(BaseModel):
     short_feedback_cz: str = Field(description="1–3 sentences in Czech.")
     tips_cz: List[str] = Field(description="2–4 short actionable tips in Czech.")
 
+class ReadingText(BaseModel):
+    level: Literal["B1", "B2", "B1-B2"]
+    title: str
+    text: str
+    word_count: int = Field(ge=80, le=260)
+    vocab: List[str] = Field(description="6–10 užitečných slovíček/kolokací z textu")
+    questions: List[str] = Field(description="2–4 krátké otázky na porozumění")
+
+# verze promptů - změna promptu musí změnit verzi, jinak cache vrací staré hodnocení
+EVALUATE_RETELLING_PROMPT_VERSION = "1"
+CHECK_SENTENCE_PROMPT_VERSION = "1"
+
+def openai_model():
+    """
+    Return name of OpenAI model for text requests
+    """
+    return os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06")  # můžeš změnit třeba na "gpt-5.2"
+
+# jeden klient na proces - sdílený pool HTTP spojení (keep-alive) místo nového TLS handshake u každého volání
+_openai_client = None
+_openai_async_client = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client() -> OpenAI:
+    """
+    Return shared OpenAI client
+    """
+    global _openai_client
+    if _openai_client is None:
+        with _openai_client_lock:
+            if _openai_client is None:
+                _openai_client = OpenAI()
+    return _openai_client
+
+def get_openai_async_client() -> AsyncOpenAI:
+    """
+    Return shared async OpenAI client
+    """
+    global _openai_async_client
+    if _openai_async_client is None:
+        with _openai_client_lock:
+            if _openai_async_client is None:
+                _openai_async_client = AsyncOpenAI()
+    return _openai_async_client
+
 class openAIClient():
     client = None
 
     def create_client(self):
-        self.client = OpenAI()
+        self.client = get_openai_client()
 
-    def get_tts(self, input_text):
+    def tts_request(self, input_text):
         """
-        Get speech from text
+        Parameters of request for speech from text
         """
-        with self.client.audio.speech.with_streaming_response.create(
+        return dict(
             model="gpt-4o-mini-tts",
             voice="marin",
             input=input_text,
             instructions="neutrally, slowly",
             response_format="mp3",
-        ) as response:
+        )
+    def get_tts(self, input_text):
+        """
+        Get speech from text
+        """
+        with self.client.audio.speech.with_streaming_response.create(**self.tts_request(input_text)) as response:
             responce_stream = response.read()
         return responce_stream
-    def get_story_by_topic(self, topic: str, level: str = "B1-B2", min_words: int = 140, max_words: int = 180, tense = "PAST"):
-        class ReadingText(BaseModel):
-            level: Literal["B1", "B2", "B1-B2"]
-            title: str
-            text: str
-            word_count: int = Field(ge=80, le=260)
-            vocab: List[str] = Field(description="6–10 užitečných slovíček/kolokací z textu")
-            questions: List[str] = Field(description="2–4 krátké otázky na porozumění")
-
+    def story_by_topic_request(self, topic: str, level: str = "B1-B2", min_words: int = 140, max_words: int = 180, tense = "PAST"):
+        """
+        Parameters of request for story by topic
+        """
         system_instructions = (
             "You are an English teacher. Create a short reading text for learners.\n"
             "Requirements:\n"
@@ -84,17 +130,22 @@ class openAIClient():
             f"Topic: {topic}\n"
             "Write ONE text (not multiple options)."
         )
-        MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06")  # můžeš změnit třeba na "gpt-5.2"
+        MODEL = openai_model()
         # store=False = omezíš ukládání na straně API (hodí se pro výukové aplikace)
-        response = self.client.responses.parse(
+        return dict(
             model=MODEL,
             instructions=system_instructions,
             input=user_prompt,
             text_format=ReadingText,
             store=False,
         )
+    def get_story_by_topic(self, topic: str, level: str = "B1-B2", min_words: int = 140, max_words: int = 180, tense = "PAST"):
+        response = self.client.responses.parse(**self.story_by_topic_request(topic, level, min_words, max_words, tense))
         return response.output_parsed
-    def evaluate_retelling(self, original_text: str, student_text: str) -> Feedback:
+    def evaluate_retelling_request(self, original_text: str, student_text: str):
+        """
+        Parameters of request for evaluation of retelling
+        """
         system_instructions = (
             "You are an English tutor.\n"
             "Task:\n"
@@ -114,16 +165,21 @@ class openAIClient():
             "STUDENT RETELLING:\n"
             f"{student_text}\n"
         )
-        MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06")
-        response = self.client.responses.parse(
+        MODEL = openai_model()
+        return dict(
             model=MODEL,
             instructions=system_instructions,
             input=user_prompt,
             text_format=Feedback,
             store=False,
         )
+    def evaluate_retelling(self, original_text: str, student_text: str) -> Feedback:
+        response = self.client.responses.parse(**self.evaluate_retelling_request(original_text, student_text))
         return response.output_parsed
-    def get_sentence_with_parameters(self, tense: str, sentence_type: str) -> Feedback:
+    def sentence_with_parameters_request(self, tense: str, sentence_type: str):
+        """
+        Parameters of request for sentence with tense and type
+        """
         system_instructions = (
         "You are an English teacher creating short practice sentences.\n"
         "Hard rules (must follow):\n"
@@ -150,16 +206,21 @@ class openAIClient():
         f"- sentence_type: {sentence_type}\n"
         "Return JSON only."
         )
-        MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06")
-        response = self.client.responses.parse(
+        MODEL = openai_model()
+        return dict(
             model=MODEL,
             instructions=system_instructions,
             input=user_prompt,
             text_format=SentenceTaskResult,
             store=False,
         )
+    def get_sentence_with_parameters(self, tense: str, sentence_type: str) -> SentenceTaskResult:
+        response = self.client.responses.parse(**self.sentence_with_parameters_request(tense, sentence_type))
         return response.output_parsed
-    def get_check_sentence(self, original_sentence, student_sentence, target_tense, target_sentence_type):
+    def check_sentence_request(self, original_sentence, student_sentence, target_tense, target_sentence_type):
+        """
+        Parameters of request for check of sentence transformation
+        """
         system_instructions = (
         "You are an English teacher checking a student's sentence transformation.\n"
         "The student must transform the original sentence into the TARGET sentence type\n"
@@ -180,13 +241,52 @@ class openAIClient():
             "Return JSON only."
             )
         #f"ORIGINAL_PHRASAL_VERB: {original_phrasal_verb}\n\n"
-        MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-2024-08-06")
-        resp = self.client.responses.parse(
+        MODEL = openai_model()
+        return dict(
             model=MODEL,
             instructions=system_instructions,
             input=user_input,
             text_format=TransformationFeedback,
             store=False,
         )
+    def get_check_sentence(self, original_sentence, student_sentence, target_tense, target_sentence_type) -> TransformationFeedback:
+        resp = self.client.responses.parse(**self.check_sentence_request(original_sentence, student_sentence, target_tense, target_sentence_type))
+        return resp.output_parsed
+
+class openAIAsyncClient(openAIClient):
+    """
+    Same requests as openAIClient over shared AsyncOpenAI, methods are awaitable
+    """
+    def create_client(self):
+        self.client = get_openai_async_client()
+
+    async def get_tts(self, input_text):
+        """
+        Get speech from text
+        """
+        async with self.client.audio.speech.with_streaming_response.create(**self.tts_request(input_text)) as response:
+            responce_stream = await response.read()
+        return responce_stream
+    async def get_story_by_topic(self, topic: str, level: str = "B1-B2", min_words: int = 140, max_words: int = 180, tense = "PAST"):
+        response = await self.client.responses.parse(**self.story_by_topic_request(topic, level, min_words, max_words, tense))
+        return response.output_parsed
+    async def stream_story_by_topic(self, topic: str, level: str = "B1-B2", min_words: int = 140, max_words: int = 180, tense = "PAST"):
+        """
+        Yield ("delta", JSON text) while story is generated and ("story", ReadingText) at the end
+        """
+        async with self.client.responses.stream(**self.story_by_topic_request(topic, level, min_words, max_words, tense)) as stream:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield "delta", event.delta
+            response = await stream.get_final_response()
+        yield "story", response.output_parsed
+    async def evaluate_retelling(self, original_text: str, student_text: str) -> Feedback:
+        response = await self.client.responses.parse(**self.evaluate_retelling_request(original_text, student_text))
+        return response.output_parsed
+    async def get_sentence_with_parameters(self, tense: str, sentence_type: str) -> SentenceTaskResult:
+        response = await self.client.responses.parse(**self.sentence_with_parameters_request(tense, sentence_type))
+        return response.output_parsed
+    async def get_check_sentence(self, original_sentence, student_sentence, target_tense, target_sentence_type) -> TransformationFeedback:
+        resp = await self.client.responses.parse(**self.check_sentence_request(original_sentence, student_sentence, target_tense, target_sentence_type))
         return resp.output_parsed
         
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Write-behind buffer of translate ratings, flushed by function translate_rating_apply
+"""
+import logging
+import os
+import threading
+from app.Endpoint.vocabulary import vocabulary_store
+
+WORD_RATING_FLUSH_SECONDS = float(os.getenv("WORD_RATING_FLUSH_SECONDS", "0"))
+
+logger = logging.getLogger(__name__)
+
+
+class RatingBuffer():
+    """
+    Ratings are collected and written in one call, 0 seconds means write immediately
+    """
+    def __init__(self, flush_seconds=WORD_RATING_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._ratings = []
+        self._database = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def apply(self, database, ratings):
+        """
+        Save ratings and update count/sum of translates in one database call
+
+        :param database: Database client
+        :param ratings: List of {"word_translate_id", "success_rate"}
+        :return: Rows {"word_translate_id", "success_rate"} with new success rate
+        """
+        rows = database.rpc("translate_rating_apply", params={"p_ratings": ratings}).execute().data
+        # váhy sampleru se přepočítají z nového success rate bez načtení slovíček
+        vocabulary_store.update_success_rates(rows)
+        return rows
+
+    def add(self, database, word_translate_id, rating):
+        """
+        Add rating, without buffer it is written immediately
+
+        :param database: Database client
+        :param word_translate_id: Translate ID
+        :param rating: Rating (0-low, 1-high)
+        """
+        item = {"word_translate_id": word_translate_id, "success_rate": rating}
+        if self.flush_seconds <= 0:
+            return self.apply(database, [item])
+        with self._lock:
+            self._database = database
+            self._ratings.append(item)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="rating-buffer", daemon=True)
+                self._thread.start()
+        return None
+
+    def flush(self):
+        """
+        Write all buffered ratings, on error they stay in buffer for next flush
+        """
+        with self._lock:
+            ratings, self._ratings = self._ratings, []
+            database = self._database
+        if not ratings:
+            return None
+        try:
+            return self.apply(database, ratings)
+        except Exception:
+            with self._lock:
+                self._ratings[:0] = ratings
+            raise
+
+    def _worker(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Rating buffer flush failed")
+
+    def close(self):
+        """
+        Stop background flush and write rest of buffer
+        """
+        self._stop.set()
+        self.flush()
+
+
+rating_buffer = RatingBuffer()
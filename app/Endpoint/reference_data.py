@@ -0,0 +1,126 @@
+"""
+Registry of small reference tables (tenses, language pairs, topics) in memory
+"""
+import os
+import random
+import threading
+import time
+from uuid import uuid4
+
+REFERENCE_DATA_TTL_SECONDS = float(os.getenv("REFERENCE_DATA_TTL_SECONDS", "600"))
+
+
+class ReferenceData():
+    """
+    Reference tables loaded at startup and refreshed after TTL or on request
+    """
+    def __init__(self, ttl_seconds=REFERENCE_DATA_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.tenses = []
+        self.languages = []
+        self.topics = []
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        # po vypršení TTL načítá tabulky jen jedno vlákno
+        self._load_lock = threading.Lock()
+
+    def load(self, database_anon):
+        """
+        Load all reference tables from database
+
+        :param database_anon: Database client
+        """
+        try:
+            tenses = database_anon.from_("tense_check_tense").select("*").execute().data
+            languages = database_anon.from_("translate_all_languages").select("*").execute().data
+            topics = database_anon.from_("storytelling_topics").select("storytelling_topics_id,topic_text,created_at").execute().data
+        except Exception as e:
+            raise Exception("Error in comunation with database") from e
+        with self._lock:
+            self.tenses, self.languages, self.topics = tenses, languages, topics
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """
+        Reference tables are loaded again on next use
+        """
+        with self._lock:
+            self.loaded_at = None
+
+    def add_topic(self, topic):
+        """
+        Add new topic to loaded topics without reload of all tables
+
+        :param topic: Row of storytelling_topics
+        """
+        with self._lock:
+            self.topics = self.topics + [topic]
+
+    def _stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.ttl_seconds
+
+    def _ensure(self, database_anon):
+        if self._stale():
+            with self._load_lock:
+                # jiné vlákno mohlo mezitím načíst
+                if self._stale():
+                    self.load(database_anon)
+
+    def get_tenses(self, database_anon):
+        """
+        Return all tenses
+
+        :param database_anon: Database client
+        """
+        self._ensure(database_anon)
+        return self.tenses
+
+    def find_tense_id(self, database_anon, text):
+        """
+        Return ID of first tense containing text in english name (like ilike %text%)
+
+        :param database_anon: Database client
+        :param text: Part of tense name
+        """
+        self._ensure(database_anon)
+        for tense in self.tenses:
+            if text.lower() in tense["text_eng"].lower():
+                return tense["tense_check_tense_id"]
+        return ""
+
+    def tense_text(self, database_anon, tense_id):
+        """
+        Return english name of tense by ID
+
+        :param database_anon: Database client
+        :param tense_id: Tense ID
+        """
+        self._ensure(database_anon)
+        for tense in self.tenses:
+            if tense["tense_check_tense_id"] == tense_id:
+                return tense["text_eng"]
+        return None
+
+    def get_languages(self, database_anon):
+        """
+        Return all supported language pairs
+
+        :param database_anon: Database client
+        """
+        self._ensure(database_anon)
+        return self.languages
+
+    def random_topic(self, database_anon):
+        """
+        Return random topic for storytelling (with random_id like view storytelling_all_topics) or None
+
+        :param database_anon: Database client
+        """
+        self._ensure(database_anon)
+        topics = self.topics
+        if not topics:
+            return None
+        return {**random.choice(topics), "random_id": str(uuid4())}
+
+
+reference_data = ReferenceData()
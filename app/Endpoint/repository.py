@@ -0,0 +1,89 @@
+"""
+Asynchronous data access to database over shared async client
+"""
+from supabase_client import get_supabase_anon_async
+
+
+async def _execute(querry):
+    try:
+        resp = await querry.execute()
+    except Exception as e:
+        raise Exception("Error in comunation with database") from e
+    return resp.data
+
+async def select_rows(table, columns="*", eq=None, in_=None, ilike=None, gte=None, or_=None, order=None, limit=None):
+    """
+    Select rows from table or view
+
+    :param table: Table or view name
+    :param columns: Selected columns
+    :param eq: Dict column -> value for equal filter
+    :param in_: Dict column -> list of values for IN filter
+    :param ilike: Dict column -> pattern for ilike filter
+    :param gte: Dict column -> value for greater or equal filter
+    :param or_: PostgREST or filter
+    :param order: List of columns for order, column with prefix "-" is descending
+    :param limit: Maximum of rows
+    """
+    database = await get_supabase_anon_async()
+    querry = database.from_(table).select(columns)
+    for column, value in (eq or {}).items():
+        querry = querry.eq(column, value)
+    for column, values in (in_ or {}).items():
+        querry = querry.in_(column, values)
+    for column, pattern in (ilike or {}).items():
+        querry = querry.ilike(column, pattern)
+    for column, value in (gte or {}).items():
+        querry = querry.gte(column, value)
+    if or_:
+        querry = querry.or_(or_)
+    for column in order or []:
+        querry = querry.order(column.lstrip("-"), desc=column.startswith("-"))
+    if limit:
+        querry = querry.limit(limit)
+    return await _execute(querry)
+
+async def insert_rows(table, data):
+    """
+    Insert one row (dict) or more rows (list) to table
+
+    :param table: Table name
+    :param data: Inserted data
+    """
+    database = await get_supabase_anon_async()
+    return await _execute(database.from_(table).insert(data))
+
+async def upsert_rows(table, data, on_conflict=""):
+    """
+    Insert or update rows in table
+
+    :param table: Table name
+    :param data: Inserted data
+    :param on_conflict: Columns of unique constraint
+    """
+    database = await get_supabase_anon_async()
+    return await _execute(database.from_(table).upsert(data, on_conflict=on_conflict))
+
+async def update_rows(table, data, eq):
+    """
+    Update rows in table
+
+    :param table: Table name
+    :param data: Updated columns
+    :param eq: Dict column -> value for equal filter
+    """
+    database = await get_supabase_anon_async()
+    querry = database.from_(table).update(data)
+    for column, value in eq.items():
+        querry = querry.eq(column, value)
+    return await _execute(querry)
+
+async def call_function(function_name, params=None):
+    """
+    Call function in database
+
+    :param function_name: Function name
+    :param params: Parameters of function
+    """
+    database = await get_supabase_anon_async()
+    return await _execute(database.rpc(function_name, params=params or {}))
@@ -0,0 +1,89 @@
+"""
+Random word sampling from vocabulary cache weighted toward low success rate
+"""
+import os
+import random
+from app.Endpoint.vocabulary import vocabulary_store
+
+# i naučená slovíčka se občas zopakují
+SAMPLER_MIN_WEIGHT = float(os.getenv("SAMPLER_MIN_WEIGHT", "0.1"))
+# slovíčko bez hodnocení
+SAMPLER_UNRATED_SUCCESS_RATE = 0.5
+
+
+def word_weight(success_rate, min_weight=SAMPLER_MIN_WEIGHT):
+    """
+    Return sampling weight of translate, lower success rate means higher weight
+
+    :param success_rate: Success rate of translate (0-1), None for unrated
+    :param min_weight: Weight of fully learned translate
+    """
+    if success_rate is None:
+        success_rate = SAMPLER_UNRATED_SUCCESS_RATE
+    return min_weight + 1.0 - min(max(success_rate, 0.0), 1.0)
+
+
+def alias_table(weights):
+    """
+    Build alias table (Vose) for constant time weighted sampling
+
+    :param weights: List of positive weights
+    :return: (probability, alias) lists
+    """
+    count = len(weights)
+    total = sum(weights)
+    scaled = [weight * count / total for weight in weights]
+    probability = [1.0] * count
+    alias = list(range(count))
+    small = [index for index, value in enumerate(scaled) if value < 1.0]
+    large = [index for index, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probability[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    return probability, alias
+
+
+class WordSampler():
+    """
+    Per language pair alias table of eligible translates with constant time sampling
+    """
+    def __init__(self, store=vocabulary_store, min_weight=SAMPLER_MIN_WEIGHT):
+        self.store = store
+        self.min_weight = min_weight
+        self._tables = {}
+
+    async def _table(self, language_from, language_to):
+        pair = await self.store.get_pair(language_from, language_to)
+        key = (language_from, language_to)
+        version = (pair.version, pair.rating_version)
+        table = self._tables.get(key)
+        if table is None or table[0] != version:
+            records = tuple(record for record in pair.ordered
+                            if record.word_id_to and record.valid_from and record.translate_valid is not False)
+            probability, alias = alias_table([word_weight(record.translate_success_rate, self.min_weight) for record in records])
+            table = (version, records, probability, alias)
+            self._tables[key] = table
+        return table[1:]
+
+    async def sample(self, id_seed, language_from, language_to):
+        """
+        Return random translate row, same seed returns same row for same vocabulary and ratings
+
+        :param id_seed: Seed for random core
+        :param language_from: Language from
+        :param language_to: Language to
+        """
+        records, probability, alias = await self._table(language_from, language_to)
+        if not records:
+            return None
+        rnd = random.Random(id_seed)
+        index = rnd.randrange(len(records))
+        if rnd.random() >= probability[index]:
+            index = alias[index]
+        return records[index]
+
+
+word_sampler = WordSampler()
@@ -1,6 +1,9 @@
-from datetime import datetime
-from uuid import uuid4
-from app.Endpoint.openAI_client import openAIClient
+import re
+from app.Endpoint.openAI_client import openAIClient, openAIAsyncClient, openai_model, TransformationFeedback, ErrorItem, CHECK_SENTENCE_PROMPT_VERSION
+from app.Endpoint.evaluation_cache import evaluation_cache
+from app.Endpoint.sentence_pool import sentence_pool, sentence_from_row, sentence_from_AI
+from app.Endpoint.reference_data import reference_data
+from app.Model.sentence import SentenceCheckAnswer
 
 
 class SentenceTense():
@@ -16,24 +19,14 @@ class SenteceType():
     tense: SentenceTense
 
 def allTenses(database_anon):
-    tenses = database_anon.from_("tense_check_tense").select("*")
-    try:
-        tenses_data = tenses.execute()
-    except Exception as e:
-        raise Exception("Error in comunation with database")
-    if len(tenses_data.data) > 0:
-        tenses_data = tenses_data.data
-    else:
-        tenses_data = None
-    return tenses_data
+    tenses_data = reference_data.get_tenses(database_anon)
+    if len(tenses_data) > 0:
+        return tenses_data
+    return None
 
 def check_tense(database_anon, tense):
-    #sentence = database_anon.from_("tense_check_all_sentence").select("*")
     if tense:
-        tense_data = database_anon.from_("tense_check_tense").select("*").ilike("text_eng", f"%{tense}%").execute()
-        if len(tense_data.data) > 0:
-            #tense = sentence.eq("tense_id", tense_data.data[0]["tense_check_tense_id"])
-            return tense_data.data[0]["tense_check_tense_id"]
+        return reference_data.find_tense_id(database_anon, tense)
     return ""
 
 def check_sentence_type(sentence_type):
@@ -41,60 +34,146 @@ def check_sentence_type(sentence_type):
         return sentence_type
     return ""
 def random_sentence(database_anon, tense_id: str, sentence_type: str):
-    sentence = database_anon.from_("tense_check_all_sentence").select("*")
+    """
+    Return random sentence, unseen sentence from pool or from database when pool is empty
+
+    :param database_anon: Database client
+    :param tense_id: Tense name (filter)
+    :param sentence_type: Sentence type (POSITIVE/NEGATIVE/QUESTION)
+    """
     if tense_id:
         tense_id = check_tense(database_anon, tense_id)
+    if sentence_type:
+        sentence_type = check_sentence_type(sentence_type).lower()
+    sentence_responce = sentence_pool.take(tense_id, sentence_type)
+    if sentence_responce:
+        return sentence_responce
+    sentence = database_anon.from_("tense_check_all_sentence").select("*")
+    if tense_id:
         sentence = sentence.eq("tense_id", tense_id)
     if sentence_type:
-        sentence_type = check_sentence_type(sentence_type)
         sentence = sentence.ilike("sentence_type", f"%{sentence_type}%")
     try:
-        sentence_data = sentence.execute()
+        sentence_data = sentence.limit(1).execute()
     except Exception as e:
         raise Exception("Error in comunation with database")
-    sentence_responce = {"text_eng": ""}
-    if datetime.now().second % 10 == 0: # len(sentence_data.data) > 20
-        sentence_data = sentence_data.data[0]
-        sentence_responce = sentence_data
-        sentence_responce = {
-            "text_eng": sentence_data["text_eng"],
-            "text_cz": sentence_data["text_cz"],
-            "tense_id": sentence_data["tense_id"],
-            "sentence_type": sentence_data["sentence_type"]
-        }
-    else:
-        # call OpenAI
-        client = openAIClient()
-        client.create_client()
-        tense_db = database_anon.from_("tense_check_tense").select("*").eq("tense_check_tense_id", tense_id).execute()
-        if len(tense_db.data) > 0:
-            tense = tense_db.data[0]["text_eng"]
-        else:
-            tense = "Past simple"
-        sentence = client.get_sentence_with_parameters(tense,sentence_type)
-        if sentence.sentence_type == "affirmative":
-            sentence.sentence_type = "positive"
-
-        sentence_responce = {
-            "text_eng": sentence.sentence,
-            "text_cz": sentence.czech_translation,
-            "tense_id": str(uuid4()),
-            "sentence_type": sentence.sentence_type
-        }
-        new_sentence = {
-            "tense_check_sentence_id": sentence_responce["tense_id"],
-             "text_eng": sentence_responce["text_eng"], 
-             "text_cz": sentence_responce["text_cz"],
-             "tts_path_eng": "",
-             "tts_path_cz": "",
-             "sentence_type": sentence_responce["sentence_type"],
-             "tense_id": check_tense(database_anon, sentence.tense)
-            }
-        sentence = database_anon.from_("tense_check_sentence").insert(new_sentence).execute()
-        #sentence.phrasal_verb
-        #sentence.word_count
-    return sentence_responce
-def check_change_sentence(database_anon, old_sentence, new_sentence, target_tense, target_sentence_type):
+    if len(sentence_data.data) > 0:
+        return sentence_from_row(sentence_data.data[0])
+    # call OpenAI
     client = openAIClient()
     client.create_client()
-    return client.get_check_sentence(old_sentence, new_sentence, target_tense, target_sentence_type)
+    tense = reference_data.tense_text(database_anon, tense_id) or "Past simple"
+    return sentence_from_AI(client, database_anon, tense_id or check_tense(database_anon, tense), tense, sentence_type or "positive")
+async def check_change_sentence(old_sentence, new_sentence, target_tense, target_sentence_type):
+    client = openAIAsyncClient()
+    client.create_client()
+    inputs = {"original": old_sentence, "student": new_sentence, "tense": target_tense.lower(), "sentence_type": target_sentence_type.lower()}
+    return await evaluation_cache.get_or_create(
+        "check_sentence", openai_model(), CHECK_SENTENCE_PROMPT_VERSION, inputs,
+        lambda: client.get_check_sentence(old_sentence, new_sentence, target_tense, target_sentence_type),
+        TransformationFeedback
+    )
+
+NEGATION_WORDS = {"not", "never", "no", "nobody", "nothing", "none", "nowhere", "neither", "nor", "cannot"}
+# zápor napsaný bez apostrofu (didnt, wont, isnt) je překlep, ne chybějící zápor
+NEGATION_WITHOUT_APOSTROPHE = re.compile(r"(do|does|did|is|are|was|were|wo|ca|could|should|would|has|have|had|must|need)nt")
+# klávesnice telefonů vkládají typografický apostrof (didn’t)
+APOSTROPHES = str.maketrans({"\u2019": "'", "\u2018": "'", "\u02bc": "'", "`": "'", "\u00b4": "'"})
+
+def normalize_apostrophes(sentence):
+    """
+    Replace typographic apostrophes by ASCII apostrophe
+
+    :param sentence: Sentence
+    """
+    return sentence.translate(APOSTROPHES)
+
+def feedback_tense(target_tense):
+    """
+    Tense of TransformationFeedback (past/present/future) from name of tense
+
+    :param target_tense: Target tense (e.g. "Past simple")
+    """
+    target_tense = (target_tense or "").lower()
+    for tense in ("past", "future"):
+        if tense in target_tense:
+            return tense
+    return "present"
+
+def feedback_sentence_type(target_sentence_type):
+    """
+    Sentence type of TransformationFeedback from POSITIVE/NEGATIVE/QUESTION
+
+    :param target_sentence_type: Target sentence type
+    """
+    target_sentence_type = (target_sentence_type or "").lower()
+    if target_sentence_type in ("negative", "question"):
+        return target_sentence_type
+    return "affirmative"
+
+def sentence_words(sentence):
+    """
+    Lower case words of sentence, "n't" is separate word
+
+    :param sentence: Sentence
+    """
+    return re.findall(r"n't|[a-z']+", normalize_apostrophes(sentence).lower().replace("n't", " n't"))
+
+def sentence_has_type(sentence, sentence_type):
+    """
+    Rough test of sentence type by question mark and negation words
+
+    :param sentence: Sentence
+    :param sentence_type: affirmative / negative / question
+    """
+    is_question = sentence.endswith("?")
+    words = sentence_words(sentence)
+    is_negative = bool(NEGATION_WORDS.intersection(words) or "n't" in words
+                       or any(NEGATION_WITHOUT_APOSTROPHE.fullmatch(word) for word in words))
+    if sentence_type == "question":
+        return is_question
+    if sentence_type == "negative":
+        return is_negative
+    return not is_question and not is_negative
+
+def precheck_sentence(check_answer: SentenceCheckAnswer):
+    """
+    Local check of obvious mistakes (empty, unchanged, missing "?" or negation) without OpenAI
+
+    :param check_answer: Source and new sentence with target tense and type
+    :return: TransformationFeedback for obvious mistake, None when OpenAI must decide
+    """
+    source = " ".join(normalize_apostrophes(check_answer.SourceSentence).split())
+    student = " ".join(normalize_apostrophes(check_answer.NewSentence).split())
+    sentence_type = feedback_sentence_type(check_answer.TargetTenseType)
+    kept_meaning = True
+    if not student:
+        kept_meaning = False
+        error = ErrorItem(category="meaning", problem="Věta je prázdná.", fix="Napiš celou větu.")
+        short_feedback = "Nenapsal(a) jsi žádnou větu."
+    elif sentence_words(student) == sentence_words(source) and not sentence_has_type(source, sentence_type):
+        error = ErrorItem(category="sentence_type", problem="Věta je stejná jako původní.", fix="Převeď větu na požadovaný typ.")
+        short_feedback = "Věta se nezměnila, je potřeba ji převést na požadovaný typ."
+    elif sentence_type == "question" and not student.endswith("?"):
+        error = ErrorItem(category="punctuation", problem="Otázka nekončí otazníkem.", fix="Dej na konec věty otazník a pomocné sloveso před podmět.")
+        short_feedback = "Otázka musí končit otazníkem."
+    elif sentence_type == "negative" and not sentence_has_type(student, "negative"):
+        error = ErrorItem(category="sentence_type", problem="Ve větě chybí zápor.", fix="Přidej zápor (např. don't / didn't / won't + sloveso).")
+        short_feedback = "Zápor ve větě chybí, věta není záporná."
+    elif sentence_type == "affirmative" and student.endswith("?"):
+        error = ErrorItem(category="sentence_type", problem="Oznamovací věta je napsaná jako otázka.", fix="Odstraň otazník a použij pořadí podmět + sloveso.")
+        short_feedback = "Věta má být oznamovací, ne otázka."
+    else:
+        return None
+    return TransformationFeedback(
+        tense=feedback_tense(check_answer.TargetTense),
+        target_sentence_type=sentence_type,
+        is_correct=False,
+        corrected_sentence="",
+        corrected_czech_translation="",
+        kept_meaning=kept_meaning,
+        kept_phrasal_verb=kept_meaning,
+        errors=[error],
+        short_feedback_cz=short_feedback,
+        tips_cz=[error.fix, "Zachovej původní čas a frázové sloveso."]
+    )
@@ -0,0 +1,226 @@
+"""
+Pool of pre-generated sentences per (tense, sentence type) with background refill
+"""
+import logging
+import os
+import random
+import threading
+from collections import deque
+from uuid import uuid4
+from app.Endpoint.openAI_client import openAIClient
+from app.Endpoint.reference_data import reference_data
+
+SENTENCE_POOL_TARGET = int(os.getenv("SENTENCE_POOL_TARGET", "20"))
+SENTENCE_POOL_LOW_WATER = int(os.getenv("SENTENCE_POOL_LOW_WATER", "5"))
+SENTENCE_POOL_REFILL_SECONDS = float(os.getenv("SENTENCE_POOL_REFILL_SECONDS", "30"))
+SENTENCE_TYPES = ("positive", "negative", "question")
+SENTENCE_POOL_PAGE_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+def sentence_from_row(row):
+    """
+    Sentence for response from row of tense_check_sentence
+
+    :param row: Row from database
+    """
+    return {
+        "text_eng": row["text_eng"],
+        "text_cz": row["text_cz"],
+        "tense_id": row["tense_id"],
+        "sentence_type": row["sentence_type"]
+    }
+
+
+def sentence_from_AI(client, database_anon, tense_id, tense_text, sentence_type):
+    """
+    Generate sentence by OpenAI and save it to database, return sentence for response
+
+    :param client: OpenAI client
+    :param database_anon: Database client
+    :param tense_id: Tense ID
+    :param tense_text: Tense name for OpenAI
+    :param sentence_type: positive / negative / question
+    """
+    return sentence_from_row(sentence_row_from_AI(client, database_anon, tense_id, tense_text, sentence_type))
+
+
+def sentence_row_from_AI(client, database_anon, tense_id, tense_text, sentence_type):
+    """
+    Generate sentence by OpenAI and save it to database, return row of tense_check_sentence
+
+    :param client: OpenAI client
+    :param database_anon: Database client
+    :param tense_id: Tense ID
+    :param tense_text: Tense name for OpenAI
+    :param sentence_type: positive / negative / question
+    """
+    sentence = client.get_sentence_with_parameters(tense_text, "affirmative" if sentence_type == "positive" else sentence_type)
+    if sentence.sentence_type == "affirmative":
+        sentence.sentence_type = "positive"
+    new_sentence = {
+        "tense_check_sentence_id": str(uuid4()),
+        "text_eng": sentence.sentence,
+        "text_cz": sentence.czech_translation,
+        "tts_path_eng": "",
+        "tts_path_cz": "",
+        "sentence_type": sentence.sentence_type,
+        "tense_id": tense_id
+    }
+    database_anon.from_("tense_check_sentence").insert(new_sentence).execute()
+    return new_sentence
+
+
+class SentencePool():
+    """
+    Stock of sentences not yet served by this process for each tense and sentence type
+    """
+    def __init__(self, target=SENTENCE_POOL_TARGET, low_water=SENTENCE_POOL_LOW_WATER, refill_seconds=SENTENCE_POOL_REFILL_SECONDS):
+        self.target = target
+        self.low_water = low_water
+        self.refill_seconds = refill_seconds
+        self.tenses = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._loaded = False
+        # ID vět, které tento proces už vložil do zásobníku (obsloužené nebo čekající)
+        self._served = set()
+        # keyset kurzor čtení tense_check_sentence pro každý zásobník
+        self._cursors = {}
+
+    def load(self, database_anon):
+        """
+        Load tenses and up to target of existing sentences per bucket from database to pool
+
+        :param database_anon: Database client
+        """
+        tenses = reference_data.get_tenses(database_anon)
+        rows = database_anon.from_("tense_check_all_sentence").select("*").execute().data
+        # tabulka roste s každým doplněním, do zásobníku se vybere náhodně nejvýš target vět
+        random.shuffle(rows)
+        with self._lock:
+            self.tenses = {tense["tense_check_tense_id"]: tense["text_eng"] for tense in tenses}
+            for tense_id in self.tenses:
+                for sentence_type in SENTENCE_TYPES:
+                    self._buckets.setdefault((tense_id, sentence_type), deque())
+            for row in rows:
+                key = (row["tense_id"], row["sentence_type"].lower())
+                if key in self._buckets and len(self._buckets[key]) < self.target:
+                    self._buckets[key].append(sentence_from_row(row))
+                    self._served.add(row["tense_check_sentence_id"])
+            self._loaded = True
+
+    def take(self, tense_id=None, sentence_type=None):
+        """
+        Return unseen sentence from pool or None when pool is empty
+
+        :param tense_id: Tense ID, any tense if empty
+        :param sentence_type: positive / negative / question, any type if empty
+        """
+        with self._lock:
+            keys = [key for key, bucket in self._buckets.items()
+                    if bucket and (not tense_id or key[0] == tense_id) and (not sentence_type or key[1] == sentence_type)]
+            if not keys:
+                self._wakeup.set()
+                return None
+            bucket = self._buckets[random.choice(keys)]
+            sentence = bucket.popleft()
+            if len(bucket) < self.low_water:
+                self._wakeup.set()
+            return sentence
+
+    def stats(self):
+        """
+        Return count of sentences per bucket
+        """
+        with self._lock:
+            return {f"{self.tenses.get(key[0], key[0])}/{key[1]}": len(bucket) for key, bucket in self._buckets.items()}
+
+    def _add(self, key, row):
+        with self._lock:
+            self._served.add(row["tense_check_sentence_id"])
+            self._buckets.setdefault(key, deque()).append(sentence_from_row(row))
+
+    def top_up_from_database(self, database_anon, key, count):
+        """
+        Add up to count sentences from database not yet served by this process
+
+        :param database_anon: Database client
+        :param key: (tense ID, sentence type) of bucket
+        :param count: Count of missing sentences
+        :return: Count of added sentences
+        """
+        tense_id, sentence_type = key
+        added = 0
+        # od začátku tabulky už není kam se vracet
+        wrapped = not self._cursors.get(key)
+        while added < count:
+            querry = (database_anon.from_("tense_check_sentence")
+                      .select("tense_check_sentence_id,text_eng,text_cz,tense_id,sentence_type")
+                      .eq("tense_id", tense_id)
+                      .ilike("sentence_type", sentence_type)
+                      .order("tense_check_sentence_id")
+                      .limit(SENTENCE_POOL_PAGE_SIZE))
+            if self._cursors.get(key):
+                querry = querry.gt("tense_check_sentence_id", self._cursors[key])
+            rows = querry.execute().data
+            for row in rows:
+                self._cursors[key] = row["tense_check_sentence_id"]
+                if row["tense_check_sentence_id"] in self._served:
+                    continue
+                self._add(key, row)
+                added += 1
+                if added >= count:
+                    return added
+            if len(rows) < SENTENCE_POOL_PAGE_SIZE:
+                if wrapped:
+                    return added
+                # věty jiných procesů mohou mít ID před kurzorem
+                self._cursors[key] = ""
+                wrapped = True
+        return added
+
+    def refill(self, database_anon):
+        """
+        Top up buckets under low-water mark to target, from database first, rest generated by OpenAI
+
+        :param database_anon: Database client
+        """
+        if not self._loaded:
+            self.load(database_anon)
+        with self._lock:
+            missing = {key: self.target - len(bucket) for key, bucket in self._buckets.items() if len(bucket) < self.low_water}
+        client = None
+        for (tense_id, sentence_type), count in missing.items():
+            count -= self.top_up_from_database(database_anon, (tense_id, sentence_type), count)
+            if count > 0 and client is None:
+                client = openAIClient()
+                client.create_client()
+            for _ in range(count):
+                row = sentence_row_from_AI(client, database_anon, tense_id, self.tenses[tense_id], sentence_type)
+                self._add((tense_id, row["sentence_type"].lower()), row)
+
+    def _worker(self, database_anon):
+        while True:
+            try:
+                self.refill(database_anon)
+            except Exception:
+                logger.exception("Sentence pool refill failed")
+            self._wakeup.wait(self.refill_seconds)
+            self._wakeup.clear()
+
+    def start(self, database_anon):
+        """
+        Start background refill of pool
+
+        :param database_anon: Database client
+        """
+        if self._thread is None and self.target > 0:
+            self._thread = threading.Thread(target=self._worker, args=(database_anon,), name="sentence-pool", daemon=True)
+            self._thread.start()
+
+
+sentence_pool = SentencePool()
@@ -0,0 +1,41 @@
+"""
+Single-flight - concurrent calls with same key share one execution
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight():
+    """
+    First caller for key runs function, concurrent callers wait for its result
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Run function once for all concurrent callers with same key
+
+        :param key: Key of call (e.g. tts_path)
+        :param function: Called function
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(function(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+
+audio_flight = SingleFlight()
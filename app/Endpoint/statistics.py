@@ -0,0 +1,51 @@
+"""
+Endpoint for path /statistics/*
+"""
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+STATISTICS_CACHE_SECONDS = float(os.getenv("STATISTICS_CACHE_SECONDS", "60"))
+STATISTICS_COLUMNS = ("word_rating_count_by_date", "storytelling_story_count_by_date", "storytelling_result_count_by_date")
+
+_weekly_cache = {"day": None, "loaded_at": 0.0, "data": None}
+_weekly_lock = threading.Lock()
+
+
+def statistics_by_day(database_anon, date_from, date_to):
+    """
+    Return daily counters from table statistics_daily, missing days have zeros
+
+    :param database_anon: Database client
+    :param date_from: First day
+    :param date_to: Last day
+    """
+    try:
+        resp = database_anon.from_("statistics_daily").select("*").gte("date_serial", date_from.isoformat()).lte("date_serial", date_to.isoformat()).execute()
+    except Exception as e:
+        raise Exception("Error in comunation with database") from e
+    rows = {row["date_serial"]: row for row in resp.data}
+    data = []
+    day = date_from
+    while day <= date_to:
+        row = rows.get(day.isoformat(), {})
+        data.append({"date_serial": day.isoformat(), **{column: row.get(column, 0) for column in STATISTICS_COLUMNS}})
+        day += timedelta(1)
+    return data
+
+
+def weekly_statistics(database_anon):
+    """
+    Return statistics for last week, cached for STATISTICS_CACHE_SECONDS
+
+    :param database_anon: Database client
+    """
+    today = date.today()
+    with _weekly_lock:
+        if _weekly_cache["day"] == today and time.monotonic() - _weekly_cache["loaded_at"] < STATISTICS_CACHE_SECONDS:
+            return _weekly_cache["data"]
+    data = statistics_by_day(database_anon, today - timedelta(7), today)
+    with _weekly_lock:
+        _weekly_cache.update(day=today, loaded_at=time.monotonic(), data=data)
+    return data
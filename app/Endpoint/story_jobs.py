@@ -0,0 +1,150 @@
+"""
+Background jobs for story generation with bounded worker pool
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+from app.Endpoint.storytelling import create_story
+
+STORY_JOB_WORKERS = int(os.getenv("STORY_JOB_WORKERS", "4"))
+STORY_JOB_MAX_QUEUED = int(os.getenv("STORY_JOB_MAX_QUEUED", "100"))
+STORY_JOB_TTL_SECONDS = float(os.getenv("STORY_JOB_TTL_SECONDS", "3600"))
+# komentář v SSE, aby proxy nezavřela nečinné spojení
+STORY_JOB_KEEPALIVE_SECONDS = 15
+
+logger = logging.getLogger(__name__)
+
+
+class StoryJobsFull(Exception):
+    """
+    Too many unfinished jobs
+    """
+
+
+class StoryJob():
+    """
+    One story generation - state, result and future of worker
+    """
+    def __init__(self, job_id, topic):
+        self.job_id = job_id
+        self.topic = topic
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+
+    def as_dict(self):
+        """
+        Return job for response
+        """
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class StoryJobs():
+    """
+    Jobs kept in memory of process, finished jobs are dropped after TTL
+    """
+    def __init__(self, workers=STORY_JOB_WORKERS, max_queued=STORY_JOB_MAX_QUEUED, ttl_seconds=STORY_JOB_TTL_SECONDS):
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        # vlastní pool - create_story sám čeká na story_executor
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="story-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at and now - job.finished_at >= self.ttl_seconds]:
+            del self._jobs[job_id]
+
+    def _run(self, job, storage_client_anon, storage_client_service):
+        job.status = "running"
+        try:
+            job.result = create_story(storage_client_anon, storage_client_service, job.topic)
+            job.status = "done"
+        except Exception as e:
+            logger.exception("Story job %s failed", job.job_id)
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+        return job
+
+    def submit(self, storage_client_anon, storage_client_service, topic):
+        """
+        Queue story generation and return job immediately
+
+        :param storage_client_anon: DB connection with anon
+        :param storage_client_service: DB connection with service
+        :param topic: Topic of story
+        """
+        with self._lock:
+            self._prune()
+            if sum(1 for job in self._jobs.values() if not job.finished_at) >= self.max_queued:
+                raise StoryJobsFull("Too many story jobs")
+            job = StoryJob(str(uuid4()), topic)
+            self._jobs[job.job_id] = job
+        job.future = self._executor.submit(self._run, job, storage_client_anon, storage_client_service)
+        return job
+
+    def get(self, job_id):
+        """
+        Return job or None
+
+        :param job_id: Job ID
+        """
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    async def events(self, job):
+        """
+        Yield server-sent events with state of job until it is finished
+
+        :param job: Story job
+        """
+        yield f"event: status\ndata: {json.dumps({'job_id': job.job_id, 'status': job.status})}\n\n"
+        future = asyncio.wrap_future(job.future)
+        while not future.done():
+            # čekání nedrží vlákno, future se dokončí z workeru
+            done, _ = await asyncio.wait({future}, timeout=STORY_JOB_KEEPALIVE_SECONDS)
+            if not done:
+                yield ": keep-alive\n\n"
+        event = "done" if job.status == "done" else "error"
+        yield f"event: {event}\ndata: {json.dumps(job.as_dict(), ensure_ascii=False)}\n\n"
+
+    def stats(self):
+        """
+        Return count of jobs by status
+        """
+        with self._lock:
+            self._prune()
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def close(self):
+        """
+        Stop worker pool, queued jobs are cancelled
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+story_jobs = StoryJobs()
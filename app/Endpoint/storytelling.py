@@ -1,23 +1,31 @@
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from uuid import uuid4
 from app.Model.storytelling import StorytellingEvaluationStory
-from app.Endpoint.openAI_client import openAIClient
-from app.Endpoint.bucket import supabase_get_bucket, supabase_file_exists, upload_file_to_bucket
+from app.Endpoint.openAI_client import openAIClient, openAIAsyncClient, openai_model, Feedback, EVALUATE_RETELLING_PROMPT_VERSION
+from app.Endpoint.evaluation_cache import evaluation_cache
+from app.Endpoint.bucket import supabase_get_bucket, supabase_file_exists, upload_file_to_bucket, upload_file_to_bucket_once
+from app.Endpoint.audio_cache import audio_cache
+from app.Endpoint.repository import insert_rows
+from app.Endpoint.reference_data import reference_data
+from app.Endpoint.single_flight import audio_flight
+from app.Endpoint.json_stream import JsonFieldExtractor
+
+STORY_PIPELINE_WORKERS = int(os.getenv("STORY_PIPELINE_WORKERS", "8"))
+# sdílený pool omezuje počet souběžných TTS/uploadů přes všechny požadavky
+story_executor = ThreadPoolExecutor(max_workers=STORY_PIPELINE_WORKERS, thread_name_prefix="story")
+
+logger = logging.getLogger(__name__)
 
 
 def get_random_topic(database_anon):
     """
     Get random topic from DB
     """
-    topics = database_anon.from_("storytelling_all_topics").select("*")
-    try:
-        topics_data = topics.execute()
-    except Exception as e:
-        raise Exception("Error in comunation with database")
-    if len(topics_data.data) > 0:
-        topics_data = topics_data.data[0]
-    else:
-        topics_data = None
-    return topics_data
+    return reference_data.random_topic(database_anon)
 
 def story_to_database(database_anon, story_title, story_text, story_title_tts_path, story_text_tts_path):
     """
@@ -51,6 +59,34 @@ def get_story_from_AI(client_ai, topic):
     story = client_ai.get_story_by_topic(topic.topic, level = "B1-B2", min_words = topic.min_words, max_words = topic.max_words, tense = topic.tense)
     return story
 
+def story_tts_to_bucket(ai_client, text, bucket_server, tts_path, storage_client_service):
+    """
+    Text-To-Speech of text and upload audio to bucket
+
+    :param ai_client: OpenAI client
+    :param text: Text to speech
+    :param bucket_server: Name bucket server
+    :param tts_path: File path in bucket
+    :param storage_client_service: DB connection with service
+    """
+    tts_data = text_to_speech(ai_client, text)
+    return upload_file_to_bucket(bucket_server, tts_path, tts_data, storage_client_service)
+
+def story_topic_id(storage_client_anon, topic_text):
+    """
+    Return ID of topic, topic is created when not exists
+
+    :param storage_client_anon: DB connection with anon
+    :param topic_text: Topic text
+    """
+    topic_dupl = storage_client_anon.from_("storytelling_topics").select("storytelling_topics_id").eq("topic_text", topic_text).execute()
+    if len(topic_dupl.data) == 0:
+        inserted = storage_client_anon.from_("storytelling_topics").insert({"topic_text": topic_text, "storytelling_topics_id": str(uuid4())}).execute()
+        if inserted.data:
+            reference_data.add_topic({key: inserted.data[0].get(key) for key in ("storytelling_topics_id", "topic_text", "created_at")})
+        topic_dupl = storage_client_anon.from_("storytelling_topics").select("storytelling_topics_id").eq("topic_text", topic_text).execute()
+    return topic_dupl.data[0]["storytelling_topics_id"]
+
 def create_story(storage_client_anon, storage_client_service, topic):
     """
     Create new story by topic
@@ -61,47 +97,107 @@ def create_story(storage_client_anon, storage_client_service, topic):
     client = openAIClient()
     # openAI Get story from topic
     story = get_story_from_AI(client, topic)
-    
-    # tts from story title
-    tts_story_title = text_to_speech(client, story.title)
+    return story_persist(storage_client_anon, storage_client_service, client, story)
+
+def log_tts_failure(tts_path):
+    """
+    Return callback of background TTS future which logs its failure
+
+    :param tts_path: File path in bucket
+    """
+    def callback(future):
+        if not future.cancelled() and future.exception() is not None:
+            # audio textu se při přehrání vygeneruje znovu přes /storytelling/speech
+            logger.error("Background story TTS %s failed", tts_path, exc_info=future.exception())
+    return callback
+
+def story_persist(storage_client_anon, storage_client_service, client, story, wait_tts=True):
+    """
+    Upload TTS of title and text, save topic and story to DB
+    :param storage_client_anon: OpenAI client anon
+    :param storage_client_service: OpenAI client service
+    :param client: OpenAI client
+    :param story: Generated story (ReadingText)
+    :param wait_tts: Wait for TTS uploads, otherwise they finish in background
+    """
+    client.create_client()
     # prepare bucket
     bucket_path = "mp3/"
-    #story_title_tts_path = f"{str(uuid4())}.mp3"
     story_title_tts_path = f"{str(uuid4())}"
+    story_text_tts_path = f"{str(uuid4())}"
     bucket_server = "words_tts"
     supabase_get_bucket(bucket_server, storage_client_service)
 
-    # upload story title to bucket
-    upload_responce = upload_file_to_bucket(bucket_server, bucket_path+story_title_tts_path+".mp3", tts_story_title, storage_client_service)
-    
-    # tts from story text
-    tts_story_text = text_to_speech(client, story.text)
-    # upload story text to bucket
-    #story_text_tts_path = f"{str(uuid4())}.mp3"
-    story_text_tts_path = f"{str(uuid4())}"
-    upload_responce = upload_file_to_bucket(bucket_server, bucket_path + story_text_tts_path+".mp3", tts_story_text, storage_client_service)
-
-    # insert topic to DB
-    topic_dupl = storage_client_anon.from_("storytelling_topics").select("storytelling_topics_id").eq("topic_text", story.title).execute()
-    if len(topic_dupl.data) == 0:
-        storage_client_anon.from_("storytelling_topics").insert({"topic_text": story.title, "storytelling_topics_id": str(uuid4())}).execute()
-        topic_dupl = storage_client_anon.from_("storytelling_topics").select("storytelling_topics_id").eq("topic_text", story.title).execute()
-    topics_id = topic_dupl.data[0]["storytelling_topics_id"]
-    # insert story to DB
+    # TTS + upload titulku a textu běží souběžně s dohledáním tématu
+    futures = [
+        story_executor.submit(story_tts_to_bucket, client, story.title, bucket_server, bucket_path + story_title_tts_path + ".mp3", storage_client_service),
+        story_executor.submit(story_tts_to_bucket, client, story.text, bucket_server, bucket_path + story_text_tts_path + ".mp3", storage_client_service),
+    ]
+    topic_future = story_executor.submit(story_topic_id, storage_client_anon, story.title)
+    if wait_tts:
+        # příběh se zapíše až po úspěšném TTS, jinak by odkazoval na neexistující audio
+        for future in futures:
+            future.result()
+    else:
+        for future, tts_path in zip(futures, (story_title_tts_path, story_text_tts_path)):
+            future.add_done_callback(log_tts_failure(bucket_path + tts_path + ".mp3"))
     story_db = story_to_database(storage_client_anon, story.title, story.text, story_title_tts_path, story_text_tts_path)
+    topics_id = topic_future.result()
     #"story_title_tts_path": story_title_tts_path, "story_text_tts_path": story_text_tts_path
     print(f"{story_db.data[0]["storytelling_story_id"]=}")
     return {"level": story.level, "title": story.title, "text": story.text, "word_count": story.word_count, "storytelling_topics_id": topics_id, "storytelling_story_id": story_db.data[0]["storytelling_story_id"]}# : story_db.storytelling_story_id
 
-def evaluate_retelling(database_anon, story: StorytellingEvaluationStory):
+def sse_event(event, data):
+    """
+    Return one server-sent event
+
+    :param event: Name of event
+    :param data: Data serialized to JSON
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def create_story_stream(storage_client_anon, storage_client_service, topic):
+    """
+    Yield server-sent events with title and text while story is generated, last event has saved story
+    :param storage_client_anon: OpenAI client anon
+    :param storage_client_service: OpenAI client service
+    :param topic: Topic of story
+    """
+    client = openAIAsyncClient()
+    client.create_client()
+    extractor = JsonFieldExtractor(("title", "text"))
+    try:
+        story = None
+        async for kind, value in client.stream_story_by_topic(topic.topic, level = "B1-B2", min_words = topic.min_words, max_words = topic.max_words, tense = topic.tense):
+            if kind == "story":
+                story = value
+                continue
+            for field, text in extractor.feed(value):
+                yield sse_event(field, {"delta": text})
+        if story is None:
+            # model odmítl odpovědět nebo odpověď není úplná
+            logger.warning("Story stream for topic %r ended without parsed story", topic.topic)
+            yield sse_event("error", {"detail": "Story was not generated, try again"})
+            return
+        # TTS se dokončí na pozadí, audio je dostupné přes /storytelling/speech
+        result = await asyncio.to_thread(story_persist, storage_client_anon, storage_client_service, openAIClient(), story, False)
+        yield sse_event("done", result)
+    except Exception as e:
+        logger.exception("Story stream failed")
+        yield sse_event("error", {"detail": str(e)})
+
+async def evaluate_retelling(story: StorytellingEvaluationStory):
     """
     
-    :param database_anon: OpenAI client anon
     :param story: Story for evaluate
     """
-    client = openAIClient()
+    client = openAIAsyncClient()
     client.create_client()
-    feedback = client.evaluate_retelling(original_text=story.original, student_text=story.student)
+    feedback = await evaluation_cache.get_or_create(
+        "evaluate_retelling", openai_model(), EVALUATE_RETELLING_PROMPT_VERSION, {"original": story.original, "student": story.student},
+        lambda: client.evaluate_retelling(original_text=story.original, student_text=story.student),
+        Feedback
+    )
     result_data =  { 
         "story_text": story.original,
         "corrected_text": feedback.corrected_text,
@@ -112,7 +208,7 @@ def evaluate_retelling(database_anon, story: StorytellingEvaluationStory):
         "improvements": feedback.improvements,
         "top_corrections": feedback.top_corrections
         }
-    database_anon.from_("storytelling_result").insert(result_data).execute()
+    await insert_rows("storytelling_result", result_data)
     return feedback
 
 def story_result_detail(story_id, storage_client_anon):
@@ -178,18 +274,37 @@ def story_speech(story_id, storage_client_service, storage_client_anon):
     :param story_id: ID story
     :param storage_client_service: OpenAI client service
     :param storage_client_anon: OpenAI client anon
+    :return: AudioObject with audio data and ETag
     """
     bucket_server = "words_tts"
     detail = story_text_detail(story_id, storage_client_anon)
     if len(detail) == 0:
         return ""
     tts_path = story_file_in_name_bucket(detail[0]["story_text_tts_path"], story_id, storage_client_anon)
+    audio = audio_cache.get(tts_path)
+    if audio:
+        return audio
+    # souběžné požadavky na stejné audio čekají na jedno stažení/syntézu
+    return audio_flight.do(tts_path, story_speech_load, tts_path, detail[0]["story_text"], bucket_server, storage_client_service)
+
+def story_speech_load(tts_path, story_text, bucket_server, storage_client_service):
+    """
+    Download audio from bucket, missing audio is created by OpenAI and uploaded
+
+    :param tts_path: Path in bucket
+    :param story_text: Text for Text-To-Speech
+    :param bucket_server: Name bucket server
+    :param storage_client_service: OpenAI client service
+    """
     bucket = supabase_get_bucket(bucket_server, storage_client_service)
     if not supabase_file_exists(bucket.id, tts_path, storage_client_service):
-        word_tts = story_download_from_openai(detail[0]["story_text"])
+        word_tts = story_download_from_openai(story_text)
         if not word_tts:
             return ""
-        upload_responce = upload_file_to_bucket(bucket_server, tts_path, word_tts, storage_client_service)
-    tts_data = storage_client_service.storage.from_(bucket.id).download(tts_path)
-    return tts_data
+        # audio máme v ruce, i když se nepodaří uložit
+        upload_file_to_bucket_once(bucket_server, bucket.id, tts_path, word_tts, storage_client_service)
+        tts_data = word_tts
+    else:
+        tts_data = storage_client_service.storage.from_(bucket.id).download(tts_path)
+    return audio_cache.put(tts_path, tts_data)
 
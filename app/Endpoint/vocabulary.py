@@ -0,0 +1,233 @@
+"""
+In-process cache of vocabulary (words with translate) per language pair
+"""
+import asyncio
+import bisect
+import itertools
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+from app.Endpoint.repository import select_rows
+
+VOCABULARY_REFRESH_SECONDS = float(os.getenv("VOCABULARY_REFRESH_SECONDS", "30"))
+# success rate mění i hodnocení zpracovaná jinými procesy, delta refresh ho nevidí
+VOCABULARY_RATES_REFRESH_SECONDS = float(os.getenv("VOCABULARY_RATES_REFRESH_SECONDS", "300"))
+# rows committed a little later than their created_at must not be missed by delta refresh
+VOCABULARY_REFRESH_OVERLAP = timedelta(seconds=5)
+# verze jsou unikátní přes všechny páry, i po invalidaci a novém načtení
+_versions = itertools.count(1)
+
+
+class VocabularyRecord(NamedTuple):
+    """
+    One row of view words_all_with_translate
+    """
+    word_translate_id: str
+    word_id_from: str
+    word_content_from: str
+    word_language_from: str
+    valid_from: bool
+    note_from: Optional[str]
+    translate_valid: Optional[bool]
+    translate_note: Optional[str]
+    translate_success_rate: Optional[float]
+    translate_created_at: Optional[str]
+    word_id_to: Optional[str]
+    word_content_to: Optional[str]
+    word_language_to: Optional[str]
+    valid_to: Optional[bool]
+    note_to: Optional[str]
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Create record from row of view words_all_with_translate
+
+        :param row: Row from database
+        """
+        return cls(*(row.get(field) for field in cls._fields))
+
+    def as_row(self):
+        """
+        Return record as row of view words_all_with_translate
+        """
+        row = self._asdict()
+        row["word_from_id"] = self.word_id_from
+        row["word_to_id"] = self.word_id_to
+        return row
+
+    def sort_key(self):
+        """
+        Order of records same as order in database querry
+        """
+        return (self.word_id_from, self.word_translate_id or "", self.word_id_to or "")
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+def _row_high_water(row):
+    timestamps = [_parse_timestamp(row.get(column)) for column in ("translate_created_at", "created_at_from", "created_at_to")]
+    timestamps = [timestamp for timestamp in timestamps if timestamp]
+    return max(timestamps) if timestamps else None
+
+
+class VocabularyPair():
+    """
+    Cached vocabulary for one language pair
+    """
+    def __init__(self):
+        self.records = {}
+        self.ordered = ()
+        self.high_water = None
+        self.refreshed_at = 0.0
+        self.version = 0
+        self.rating_version = 0
+        self.rates_refreshed_at = time.monotonic()
+        # hodnocení přichází z vláken (threadpool, rating buffer), načítání z event loopu
+        self._lock = threading.Lock()
+
+    def merge(self, rows):
+        """
+        Merge rows from database to cache
+
+        :param rows: Rows of view words_all_with_translate
+        :return: True if cache changed
+        """
+        changed = False
+        with self._lock:
+            for row in rows:
+                record = VocabularyRecord.from_row(row)
+                if self.records.get(record.word_translate_id) != record:
+                    self.records[record.word_translate_id] = record
+                    changed = True
+                row_high_water = _row_high_water(row)
+                if row_high_water and (not self.high_water or row_high_water > self.high_water):
+                    self.high_water = row_high_water
+            if changed:
+                self.ordered = tuple(sorted(self.records.values(), key=VocabularyRecord.sort_key))
+                self.version = next(_versions)
+        return changed
+
+    def update_success_rates(self, rates):
+        """
+        Update success rate of cached translates, version of listing stays (it has no success rate)
+
+        :param rates: Dict translate ID -> new success rate
+        :return: True if cache changed
+        """
+        changed = False
+        with self._lock:
+            for word_translate_id, success_rate in rates.items():
+                record = self.records.get(word_translate_id)
+                if record is not None and record.translate_success_rate != success_rate:
+                    self.records[word_translate_id] = record._replace(translate_success_rate=success_rate)
+                    changed = True
+            if changed:
+                # pořadí se nemění, stačí vyměnit záznamy
+                self.ordered = tuple(self.records[record.word_translate_id] for record in self.ordered)
+                self.rating_version = next(_versions)
+        return changed
+
+    def index_after(self, word_id):
+        """
+        Return index of first record with word_id_from greater than word_id (keyset)
+
+        :param word_id: Last word ID of previous page, from start if empty
+        """
+        if not word_id:
+            return 0
+        return bisect.bisect_right(self.ordered, word_id, key=lambda record: record.word_id_from)
+
+
+class VocabularyStore():
+    """
+    Vocabulary per language pair loaded once and refreshed by created_at high-water marks
+    """
+    def __init__(self, refresh_seconds=VOCABULARY_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._pairs = {}
+        self._locks = {}
+
+    async def _load(self, language_from, language_to, pair):
+        or_filter = None
+        if pair.high_water:
+            since = (pair.high_water - VOCABULARY_REFRESH_OVERLAP).isoformat()
+            or_filter = ",".join(f'{column}.gte."{since}"' for column in ("translate_created_at", "created_at_from", "created_at_to"))
+        rows = await select_rows(
+            "words_all_with_translate",
+            eq={"word_language_from": language_from, "word_language_to": language_to},
+            or_=or_filter,
+        )
+        pair.merge(rows)
+        if or_filter and time.monotonic() - pair.rates_refreshed_at >= VOCABULARY_RATES_REFRESH_SECONDS:
+            rates = await select_rows(
+                "words_all_with_translate",
+                columns="word_translate_id,translate_success_rate",
+                eq={"word_language_from": language_from, "word_language_to": language_to},
+            )
+            pair.update_success_rates({row["word_translate_id"]: row["translate_success_rate"] for row in rates})
+            pair.rates_refreshed_at = time.monotonic()
+        pair.refreshed_at = time.monotonic()
+
+    async def get_pair(self, language_from, language_to) -> VocabularyPair:
+        """
+        Return cached vocabulary for language pair, load or refresh it when needed
+
+        :param language_from: Language from
+        :param language_to: Language to
+        """
+        key = (language_from, language_to)
+        pair = self._pairs.get(key)
+        if pair is not None and time.monotonic() - pair.refreshed_at < self.refresh_seconds:
+            return pair
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # jiný požadavek mohl mezitím data načíst
+            pair = self._pairs.get(key)
+            if pair is None:
+                pair = VocabularyPair()
+                await self._load(language_from, language_to, pair)
+                self._pairs[key] = pair
+            elif time.monotonic() - pair.refreshed_at >= self.refresh_seconds:
+                await self._load(language_from, language_to, pair)
+            return pair
+
+    async def get_records(self, language_from, language_to):
+        """
+        Return all records for language pair ordered by word_id_from
+
+        :param language_from: Language from
+        :param language_to: Language to
+        """
+        return (await self.get_pair(language_from, language_to)).ordered
+
+    def update_success_rates(self, rows):
+        """
+        Apply new success rates returned by database to all cached pairs
+
+        :param rows: Rows {"word_translate_id", "success_rate"}
+        """
+        rates = {row["word_translate_id"]: row["success_rate"] for row in rows or []}
+        if rates:
+            # volá se z vlákna, kopie slovníku je atomická
+            for pair in self._pairs.copy().values():
+                pair.update_success_rates(rates)
+
+    def invalidate(self, language=None):
+        """
+        Drop cached vocabulary, next request load it again from database
+
+        :param language: Drop only pairs with this language, all pairs if empty
+        """
+        for key in list(self._pairs):
+            if not language or language in key:
+                self._pairs.pop(key, None)
+
+
+vocabulary_store = VocabularyStore()
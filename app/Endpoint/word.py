@@ -3,13 +3,28 @@ Endpoint for path /word/*
 """
 #from fastapi import HTTPException, status
 #from openai import OpenAI
-import random
+import asyncio
+import itertools
+import json
+import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from app.Endpoint.openAI_client import openAIClient
-from app.Endpoint.bucket import supabase_get_bucket, supabase_file_exists, upload_file_to_bucket
+from app.Endpoint.bucket import supabase_get_bucket, supabase_file_exists, upload_file_to_bucket_once
+from app.Endpoint.audio_cache import audio_cache
+from app.Endpoint.single_flight import audio_flight
+from app.Endpoint.rating_buffer import rating_buffer
+from app.Endpoint.repository import select_rows, insert_rows
+from app.Endpoint.vocabulary import VocabularyRecord, vocabulary_store
+from app.Endpoint.sampler import word_sampler
 from openai import OpenAI
 from app.Model.word import WordContentIn
 
+# ID slov v jednom dotazu IN (délka URL)
+WORD_DETAIL_CHUNK_SIZE = 100
+SPEECH_BUNDLE_WORKERS = int(os.getenv("SPEECH_BUNDLE_WORKERS", "8"))
+# sdílený pool pro stahování audia více slov najednou
+speech_executor = ThreadPoolExecutor(max_workers=SPEECH_BUNDLE_WORKERS, thread_name_prefix="speech")
 
 
 def word_download_from_openai(input_text):
@@ -34,7 +49,7 @@ def word_detail(word_id, storage_client_anon):
     """
     word_detail = storage_client_anon.from_("word_content").select("word_id,word_content,tts_path").eq("word_id", word_id).execute()
     return word_detail.data
-def word_detail_with_translate(word_id, storage_client_anon):
+async def word_detail_with_translate(word_id):
     """
     Return word detail with translate
     
@@ -42,35 +57,34 @@ def word_detail_with_translate(word_id, storage_client_anon):
     """
     if not word_id:
         raise Exception("Word ID not exists")
-    try:
-        resp = storage_client_anon.from_("words_all_with_translate").select("*").eq("word_id_from", word_id).execute()
-    except Exception as e:
-        raise Exception("Error in comunation with database") from e
-        #raise HTTPException(status_code=500, detail="Error in comunation with database") from e
-    if len(resp.data) == 0:
-        raise Exception(f"Word with id '{word_id}' not found") from e
+    rows = await select_rows("words_all_with_translate", eq={"word_id_from": word_id})
+    if len(rows) == 0:
+        raise Exception(f"Word with id '{word_id}' not found")
         #raise HTTPException(
         #    status_code=status.HTTP_404_NOT_FOUND,
         #    detail=f"Word with id '{word_id}' not found"
         #)
-    translate_all = []
-    for translate in resp.data:
-        if translate["word_id_to"]:
-            translate_all.append({"word_id": translate["word_id_to"],
-                    "word_content": translate["word_content_to"],
-                    "word_language": translate["word_language_to"],
-                    "valid": translate["valid_to"],
-                    "note": translate["note_to"]})
-    return [
-            {
-                "word_id": resp.data[0]["word_id_from"],
-                "word_content": resp.data[0]["word_content_from"],
-                "word_language": resp.data[0]["word_language_from"],
-                "valid": resp.data[0]["valid_from"],
-                "note": resp.data[0]["note_from"],
-                "translate": translate_all
-            }
-        ]
+    records = sorted((VocabularyRecord.from_row(row) for row in rows), key=VocabularyRecord.sort_key)
+    return list(word_entries(records))
+
+async def words_detail_with_translate(word_ids):
+    """
+    Return details of words with translate in order of word_ids, unknown IDs are skipped
+
+    :param word_ids: List of word IDs
+    """
+    unique_ids = list(dict.fromkeys(word_id for word_id in word_ids if word_id))
+    if not unique_ids:
+        return []
+    # dlouhý seznam ID v URL dotazu PostgREST brána odmítne (414), dotazy po částech běží souběžně
+    chunks = await asyncio.gather(*(
+        select_rows("words_all_with_translate", in_={"word_id_from": unique_ids[start:start + WORD_DETAIL_CHUNK_SIZE]})
+        for start in range(0, len(unique_ids), WORD_DETAIL_CHUNK_SIZE)
+    ))
+    rows = [row for chunk in chunks for row in chunk]
+    records = sorted((VocabularyRecord.from_row(row) for row in rows), key=VocabularyRecord.sort_key)
+    entries = {entry["word_id"]: entry for entry in word_entries(records)}
+    return [entries[word_id] for word_id in word_ids if word_id in entries]
 
 def word_file_in_name_bucket(tts_path, word_id, storage_client_anon):
     """
@@ -90,106 +104,159 @@ def word_speech(word_id, storage_client_service, storage_client_anon):
     Return speech for word
     
     :param word_id: ID word
+    :return: AudioObject with audio data and ETag
     """
     bucket_server = "words_tts"
     detail = word_detail(word_id, storage_client_anon)
     if len(detail) == 0:
         return ""
     tts_path = word_file_in_name_bucket(detail[0]["tts_path"], word_id, storage_client_anon)
+    audio = audio_cache.get(tts_path)
+    if audio:
+        return audio
+    # souběžné požadavky na stejné audio čekají na jedno stažení/syntézu
+    return audio_flight.do(tts_path, word_speech_load, tts_path, detail[0]["word_content"], bucket_server, storage_client_service)
+
+def words_speech(word_ids, storage_client_service, storage_client_anon):
+    """
+    Return speech for more words, details by one querry and downloads in parallel
+
+    :param word_ids: List of word IDs
+    :return: List of (word_id, AudioObject or "") in order of word_ids
+    """
+    bucket_server = "words_tts"
+    unique_ids = list(dict.fromkeys(word_id for word_id in word_ids if word_id))
+    if not unique_ids:
+        return []
+    details = storage_client_anon.from_("word_content").select("word_id,word_content,tts_path").in_("word_id", unique_ids).execute().data
+    audio = {}
+    futures = {}
+    for detail in details:
+        tts_path = word_file_in_name_bucket(detail["tts_path"], detail["word_id"], storage_client_anon)
+        audio[detail["word_id"]] = audio_cache.get(tts_path)
+        if not audio[detail["word_id"]]:
+            futures[detail["word_id"]] = speech_executor.submit(
+                audio_flight.do, tts_path, word_speech_load, tts_path, detail["word_content"], bucket_server, storage_client_service)
+    for word_id, future in futures.items():
+        try:
+            audio[word_id] = future.result()
+        except Exception:
+            audio[word_id] = ""
+    return [(word_id, audio.get(word_id) or "") for word_id in word_ids]
+
+def word_speech_load(tts_path, word_content, bucket_server, storage_client_service):
+    """
+    Download audio from bucket, missing audio is created by OpenAI and uploaded
+
+    :param tts_path: Path in bucket
+    :param word_content: Word for Text-To-Speech
+    :param bucket_server: Name bucket server
+    :param storage_client_service: client to server
+    """
     bucket = supabase_get_bucket(bucket_server, storage_client_service)
     if not supabase_file_exists(bucket.id, tts_path, storage_client_service):
-        word_tts = word_download_from_openai(detail[0]["word_content"])
+        word_tts = word_download_from_openai(word_content)
         if not word_tts:
             return ""
-        upload_responce = upload_file_to_bucket(bucket_server, tts_path, word_tts, storage_client_service)
-    tts_data = storage_client_service.storage.from_(bucket.id).download(tts_path)
-    return tts_data
+        # audio máme v ruce, i když se nepodaří uložit
+        upload_file_to_bucket_once(bucket_server, bucket.id, tts_path, word_tts, storage_client_service)
+        tts_data = word_tts
+    else:
+        tts_data = storage_client_service.storage.from_(bucket.id).download(tts_path)
+    return audio_cache.put(tts_path, tts_data)
 
 
-def word_rating_append(word_translate_id, rating, storage_client_anon):
+def word_rating(word_translate_id, rating, storage_client_anon):
     """
-    Add rating for word to database
+    Add rating for word, success rate is updated incrementally from count and sum
     
     :param word_translate_id: Translate ID
-    :param rating: Rating
+    :param rating: Rating (0-low, 1-high)
     :param storage_client_anon: Database client
     """
-    insert_data = {}
-    insert_data["word_translate_id"] = word_translate_id
-    insert_data["success_rate"] = rating
-    storage_client_anon.from_("word_translate_success_rate").insert(insert_data).execute()
+    return rating_buffer.add(storage_client_anon, word_translate_id, rating)
 
-def translate_rating_recalculation(word_translate_id, storage_client_anon):
+def word_entries(records):
     """
-    Call function in database for recalculation rating for word
-    
-    :param word_translate_id: Translate ID
-    :param storage_client_anon: Database client
+    Yield exactly one word with its unique translates per word_id_from (one pass)
+
+    :param records: Iterable of VocabularyRecord ordered by word_id_from
     """
-    storage_client_anon.rpc("translate_rating_recalculation", params={"p_word_translate_id": word_translate_id}).execute()
+    for word_id, group in itertools.groupby(records, key=lambda record: record.word_id_from):
+        first = next(group)
+        translate = {}
+        for record in itertools.chain((first,), group):
+            # stejný překlad může být ve view vícekrát (více vazeb word_translate)
+            if record.word_id_to and record.word_id_to not in translate:
+                translate[record.word_id_to] = {
+                    "word_id": record.word_id_to,
+                    "word_content": record.word_content_to,
+                    "word_language": record.word_language_to,
+                    "valid": record.valid_to,
+                    "note": record.note_to
+                }
+        yield {
+            "word_id": word_id,
+            "word_content": first.word_content_from,
+            "word_language": first.word_language_from,
+            "valid": first.valid_from,
+            "note": first.note_from,
+            "translate": list(translate.values())
+        }
 
+async def valid_word_entries(language_from, language_to, after=None):
+    """
+    Return generator of valid words with translate after word ID (keyset)
 
-def word_rating(word_translate_id, rating, storage_client_anon):
+    :param language_from: Language from
+    :param language_to: Language to
+    :param after: Last word ID of previous page
     """
-    Add rating and recalculating for word
-    
-    :param word_translate_id: Translate ID
-    :param rating: Rating (0-low, 1-high)
-    :param storage_client_anon: Database client
+    pair = await vocabulary_store.get_pair(language_from, language_to)
+    ordered = pair.ordered
+    records = itertools.islice(ordered, pair.index_after(after), len(ordered))
+    return word_entries(record for record in records if record.valid_from)
+
+async def get_words_page(language_from, language_to, after=None, limit=500):
     """
-    word_rating_append(word_translate_id, rating, storage_client_anon)
-    translate_rating_recalculation(word_translate_id, storage_client_anon)
-
-def get_all_words_with_translate(database_anon, language_from, language_to):
-    querry = database_anon.from_("words_all_with_translate").select("*")
-    querry = querry.eq("word_language_from", language_from)
-    querry = querry.eq("valid_from", True)
-    querry = querry.eq("word_language_to", language_to)
-    querry = querry.order("word_id_from")
-    querry = querry.order("word_translate_id")
-    querry = querry.order("word_id_to")
-    try:
-        word_content_data = querry.execute()
-    except Exception as e:
-        raise Exception("Error in comunation with database") from e
-    tran = {}
-    for word in word_content_data.data:
-        if word["word_id_from"] not in tran:
-            tran[word["word_id_from"]] = []
-        tran[word["word_id_from"]].append(
-            {
-                "word_id": word["word_id_to"],
-                "word_content": word["word_content_to"],
-                "word_language": word["word_language_to"],
-                "valid": word["valid_to"],
-                "note": word["note_to"]
-            }
-        )
-    data_responce = []
-    for word in word_content_data.data:
-        data_responce.append(
-            {
-                "word_id": word["word_id_from"],
-                "word_content": word["word_content_from"],
-                "word_language": word["word_language_from"],
-                "valid": word["valid_from"],
-                "note": word["note_from"],
-                "translate": tran[word["word_id_from"]]
-            }
-            )
-    return data_responce
+    Return page of valid words with translate and cursor for next page
+
+    :param language_from: Language from
+    :param language_to: Language to
+    :param after: Cursor - last word ID of previous page
+    :param limit: Maximum of words in page
+    :return: (words, next cursor or None)
+    """
+    entries = await valid_word_entries(language_from, language_to, after)
+    data = list(itertools.islice(entries, limit + 1))
+    if len(data) > limit:
+        return data[:limit], data[limit - 1]["word_id"]
+    return data, None
+
+async def ndjson_words(language_from, language_to, after=None, chunk_size=200):
+    """
+    Yield valid words with translate as NDJSON (one word per line)
 
-def create_word(word: WordContentIn, database_anon):
+    :param language_from: Language from
+    :param language_to: Language to
+    :param after: Last word ID of previous page
+    :param chunk_size: Words in one chunk of response
+    """
+    entries = await valid_word_entries(language_from, language_to, after)
+    while True:
+        chunk = [json.dumps(entry, ensure_ascii=False) + "\n" for entry in itertools.islice(entries, chunk_size)]
+        if not chunk:
+            return
+        yield "".join(chunk).encode("utf-8")
+
+async def create_word(word: WordContentIn):
     """
     Create new word
     """
     if not word.word_id:
         word.word_id = str(uuid.uuid4())
-    try:
-        data = database_anon.from_("word_content").select("*").eq("word_id", word.word_id).execute()
-    except Exception as e:
-        raise Exception("Error in communication with database")
-    if len(data.data) > 0:
+    data = await select_rows("word_content", eq={"word_id": word.word_id})
+    if len(data) > 0:
         raise Exception("Word ID is exists")
     insert = {
         "word_id": word.word_id,
@@ -198,32 +265,29 @@ def create_word(word: WordContentIn, database_anon):
         "valid": word.valid,
         "note": word.note
     }
-    try:
-        database_anon.from_("word_content").insert(insert).execute()
-    except Exception as e:
-        raise Exception("Error in comunation with database") from e
-    try:
-        resp = database_anon.from_("word_content").select("*").eq("word_id", word.word_id).execute()
-    except Exception as e:
-        raise Exception("Error in comunation with database") from e
-    if len(resp.data) == 0:
-        raise Exception(f"Word with id '{word.word_id}' not found") from e
+    await insert_rows("word_content", insert)
+    vocabulary_store.invalidate(insert["word_language"])
+    resp = await select_rows("word_content", eq={"word_id": word.word_id})
+    if len(resp) == 0:
+        raise Exception(f"Word with id '{word.word_id}' not found")
     return {
-                "word_id": resp.data[0]["word_id"],
-                "word_content": resp.data[0]["word_content"],
-                "word_language": resp.data[0]["word_language"],
-                "valid": resp.data[0]["valid"],
-                "note": resp.data[0]["note"],
+                "word_id": resp[0]["word_id"],
+                "word_content": resp[0]["word_content"],
+                "word_language": resp[0]["word_language"],
+                "valid": resp[0]["valid"],
+                "note": resp[0]["note"],
                 "translate": []
             }
 
-def random_word(database_anon, id_seed, word_language_from, word_language_to):
-    resp = database_anon.from_("words_all_with_translate").select("*").eq("word_language_from", word_language_from).eq("word_language_to", word_language_to).order("random_id", desc=True).execute()
-    if len(resp.data) > 0:
-        random.seed(id_seed)
-        random.seed()
-        index = random.randint(0,len(resp.data)-1)
-        data = resp.data[index]
-    else:
-        data = []
-    return data
+async def random_word(id_seed, word_language_from, word_language_to):
+    """
+    Return random word with translate for language pair
+
+    :param id_seed: Seed for random core
+    :param word_language_from: Language from
+    :param word_language_to: Language to
+    """
+    record = await word_sampler.sample(id_seed, word_language_from, word_language_to)
+    if not record:
+        return []
+    return record.as_row()
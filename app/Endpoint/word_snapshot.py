@@ -0,0 +1,147 @@
+"""
+Pre-serialized and pre-compressed snapshots of word listing per language pair
+"""
+import asyncio
+import gzip
+import hashlib
+from typing import NamedTuple
+from fastapi.responses import Response
+from app.Endpoint.audio_response import etag_matches
+from app.Endpoint.encoding import accept_quality, encode_content, negotiate_media_type
+from app.Endpoint.vocabulary import vocabulary_store
+from app.Endpoint.word import word_entries
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SNAPSHOT_GZIP_LEVEL = 6
+SNAPSHOT_BROTLI_QUALITY = 5
+
+
+class WordSnapshot(NamedTuple):
+    """
+    Encoded listing for one version of vocabulary with compressed variants
+    """
+    version: int
+    media_type: str
+    etag: str
+    bodies: dict
+
+
+def build_snapshot(version, records, media_type):
+    """
+    Serialize valid words of records and compress them
+
+    :param version: Version of vocabulary pair
+    :param records: Records ordered by word_id_from
+    :param media_type: JSON or MessagePack media type
+    """
+    body = encode_content({
+        "status": "OK",
+        "data": list(word_entries(record for record in records if record.valid_from))
+    }, media_type)
+    bodies = {"identity": body, "gzip": gzip.compress(body, SNAPSHOT_GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=SNAPSHOT_BROTLI_QUALITY)
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return WordSnapshot(version, media_type, etag, bodies)
+
+
+def snapshot_etag(etag, encoding):
+    """
+    Return ETag of snapshot variant for content encoding
+
+    :param etag: ETag of identity body
+    :param encoding: Content encoding
+    """
+    if encoding == "identity":
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def choose_encoding(accept_encoding, bodies):
+    """
+    Return best content encoding accepted by client from available variants
+
+    :param accept_encoding: Value of header Accept-Encoding
+    :param bodies: Variants by content encoding
+    """
+    qualities = accept_quality(accept_encoding)
+    best, best_quality = "identity", 0.0
+    for encoding in ("br", "gzip"):
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if encoding in bodies and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class WordSnapshots():
+    """
+    Snapshots by (language pair, media type), rebuilt only when version of vocabulary pair changes
+    """
+    def __init__(self):
+        self._snapshots = {}
+        self._locks = {}
+        self.builds = 0
+
+    async def get(self, language_from, language_to, media_type):
+        """
+        Return current snapshot, build it when vocabulary changed
+
+        :param language_from: Language from
+        :param language_to: Language to
+        :param media_type: JSON or MessagePack media type
+        """
+        pair = await vocabulary_store.get_pair(language_from, language_to)
+        key = (language_from, language_to, media_type)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.version == pair.version:
+            return snapshot
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            snapshot = self._snapshots.get(key)
+            if snapshot is None or snapshot.version != pair.version:
+                # komprese velkého seznamu neblokuje event loop
+                snapshot = await asyncio.to_thread(build_snapshot, pair.version, pair.ordered, media_type)
+                self._snapshots[key] = snapshot
+                self.builds += 1
+            return snapshot
+
+    async def response(self, language_from, language_to, accept=None, accept_encoding=None, if_none_match=None):
+        """
+        Return 304 for matching If-None-Match, otherwise precompressed snapshot
+
+        :param language_from: Language from
+        :param language_to: Language to
+        :param accept: Value of header Accept
+        :param accept_encoding: Value of header Accept-Encoding
+        :param if_none_match: Value of header If-None-Match
+        """
+        snapshot = await self.get(language_from, language_to, negotiate_media_type(accept))
+        encoding = choose_encoding(accept_encoding, snapshot.bodies)
+        headers = {
+            # každé kódování má vlastní ETag, obsah se liší
+            "ETag": snapshot_etag(snapshot.etag, encoding),
+            "Vary": "Accept, Accept-Encoding",
+            "Cache-Control": "no-cache",
+        }
+        if any(etag_matches(if_none_match, snapshot_etag(snapshot.etag, variant)) for variant in snapshot.bodies):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=snapshot.bodies[encoding], media_type=snapshot.media_type, headers=headers)
+
+    def stats(self):
+        """
+        Return count of snapshots, builds and size of variants
+        """
+        return {
+            "snapshots": len(self._snapshots),
+            "builds": self.builds,
+            "bytes": {"/".join(key): {encoding: len(body) for encoding, body in snapshot.bodies.items()}
+                      for key, snapshot in self._snapshots.items()}
+        }
+
+
+word_snapshots = WordSnapshots()
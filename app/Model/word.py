@@ -19,6 +19,18 @@ class WordContentIn(BaseModel):
     valid_to: Optional[bool] = Field(description="[to]Word is valid")
     note_to: Optional[str] = Field(description="[to]Description")
 
+class WordDetailBatchIn(BaseModel):
+    """
+    Word IDs for batch detail - incoming
+    """
+    word_ids: list[str] = Field(description="IDs of words, response keeps this order", min_length=1, max_length=500)
+
+class WordSpeechBundleIn(BaseModel):
+    """
+    Word IDs for audio bundle - incoming
+    """
+    word_ids: list[str] = Field(description="IDs of words, parts of response keep this order", min_length=1, max_length=50)
+
 class WordTranslateIn(BaseModel):
     """
     Translate of word - incoming
@@ -57,6 +69,7 @@ class EnvelopeWordContentOut(BaseModel):
     """
     status: str = Field(description="Return staus")
     data: Optional[list[WordContentOut]]
+    next_cursor: Optional[str] = Field(description="Cursor for next page (word_id of last word)", default=None)
 
 class WordSpeechOut(BaseModel):
     """
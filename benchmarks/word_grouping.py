@@ -0,0 +1,100 @@
+"""
+Benchmark seskupení slovíček - velikost odpovědi a čas sestavení (python -m benchmarks.word_grouping)
+"""
+import argparse
+import json
+import random
+import time
+from app.Endpoint.vocabulary import VocabularyRecord
+from app.Endpoint.word import word_entries
+
+
+def generate_records(words, translates, seed=0):
+    """
+    Return records of view words_all_with_translate ordered by word_id_from
+
+    :param words: Count of source words
+    :param translates: Maximum of translates for one word
+    :param seed: Seed of random generator
+    """
+    rnd = random.Random(seed)
+    records = []
+    for word_index in range(words):
+        for translate_index in range(rnd.randint(1, translates)):
+            records.append(VocabularyRecord(
+                word_translate_id=f"t{word_index:07d}-{translate_index}",
+                word_id_from=f"w{word_index:07d}",
+                word_content_from=f"word {word_index}",
+                word_language_from="EN",
+                valid_from=True,
+                note_from=None,
+                translate_valid=True,
+                translate_note=None,
+                translate_success_rate=rnd.random(),
+                translate_created_at=None,
+                word_id_to=f"x{word_index:07d}-{translate_index}",
+                word_content_to=f"slovo {word_index} {translate_index}",
+                word_language_to="CZ",
+                valid_to=True,
+                note_to=None
+            ))
+    return sorted(records, key=VocabularyRecord.sort_key)
+
+
+def per_row_entries(records):
+    """
+    Previous grouping - one entry per row of view, each with all translates of word
+
+    :param records: Records ordered by word_id_from
+    """
+    tran = {}
+    for word in records:
+        tran.setdefault(word.word_id_from, []).append({
+            "word_id": word.word_id_to,
+            "word_content": word.word_content_to,
+            "word_language": word.word_language_to,
+            "valid": word.valid_to,
+            "note": word.note_to
+        })
+    return [
+        {
+            "word_id": word.word_id_from,
+            "word_content": word.word_content_from,
+            "word_language": word.word_language_from,
+            "valid": word.valid_from,
+            "note": word.note_from,
+            "translate": tran[word.word_id_from]
+        }
+        for word in records
+    ]
+
+
+def measure(name, grouping, records, repeat):
+    """
+    Print best build time, count of entries and size of JSON payload
+
+    :param name: Name of variant
+    :param grouping: Function records -> list of entries
+    :param records: Records ordered by word_id_from
+    :param repeat: Count of runs
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        entries = list(grouping(records))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    payload = json.dumps({"status": "OK", "data": entries}, ensure_ascii=False).encode("utf-8")
+    print(f"{name:10} entries {len(entries):8}  payload {len(payload) / 1024 / 1024:8.2f} MiB  build {best * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of word listing grouping")
+    parser.add_argument("--words", type=int, default=20000, help="Count of source words")
+    parser.add_argument("--translates", type=int, default=4, help="Maximum of translates for one word")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each variant")
+    args = parser.parse_args()
+    records = generate_records(args.words, args.translates)
+    print(f"{args.words} words, {len(records)} rows")
+    measure("per-row", per_row_entries, records, args.repeat)
+    measure("grouped", word_entries, records, args.repeat)
@@ -1,25 +1,36 @@
 """
 Main program for start api
 """
-from datetime import date, timedelta
-from io import BytesIO
+import asyncio
+import logging
 import uuid
 import os
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, Header, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
-from supabase_client import supabase_anon as database_anon, supabase_service as database_service
-from app.Endpoint.word import word_speech, word_detail_with_translate, word_rating, get_all_words_with_translate, create_word, random_word
+from supabase_client import supabase_anon as database_anon, supabase_service as database_service, close_supabase_async
+from app.Endpoint.word import word_speech, words_speech, word_detail_with_translate, words_detail_with_translate, word_rating, get_words_page, ndjson_words, create_word, random_word
 from app.Endpoint.matching import matching_set_rating
-from app.Endpoint.sentence import random_sentence, allTenses, check_change_sentence
-from app.Endpoint.storytelling import get_random_topic, create_story, evaluate_retelling, story_speech
-from app.Model.word import EnvelopeWordContentOut, WordContentIn, EnvelopeWordSpeechOut, EnvelopeWordRating, EnvelopeWordAllLanguages
+from app.Endpoint.sentence import random_sentence, allTenses, check_change_sentence, precheck_sentence
+from app.Endpoint.storytelling import get_random_topic, create_story, create_story_stream, evaluate_retelling, story_speech
+from app.Endpoint.story_jobs import story_jobs, StoryJobsFull
+from app.Endpoint.audio_cache import audio_cache
+from app.Endpoint.sentence_pool import sentence_pool
+from app.Endpoint.reference_data import reference_data
+from app.Endpoint.evaluation_cache import evaluation_cache
+from app.Endpoint.rating_buffer import rating_buffer
+from app.Endpoint.statistics import weekly_statistics
+from app.Endpoint.audio_response import audio_response, audio_bundle_response
+from app.Endpoint.encoding import encoded_response
+from app.Endpoint.word_snapshot import word_snapshots
+from app.Model.word import EnvelopeWordContentOut, WordContentIn, WordDetailBatchIn, WordSpeechBundleIn, EnvelopeWordSpeechOut, EnvelopeWordRating, EnvelopeWordAllLanguages
 from app.Model.matching import MatchingRating
 from app.Model.sentence import SentenceType, SentenceCheckAnswer
 from app.Model.storytelling import StorytellingStoryByTopic, StorytellingEvaluationStory
 
 app = FastAPI(title="Vodouš API", version="0.1.0")
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -33,13 +44,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_word_detail(word_id):
+@app.on_event("startup")
+async def startup_reference_data():
+    """
+    Load reference tables, when database is not available they are loaded on first use
+    """
+    try:
+        await asyncio.to_thread(reference_data.load, database_anon)
+    except Exception:
+        logger.exception("Reference data not loaded at startup")
+
+@app.on_event("startup")
+async def startup_sentence_pool():
+    """
+    Start background refill of sentence pool
+    """
+    sentence_pool.start(database_anon)
+
+@app.on_event("shutdown")
+async def shutdown_database():
+    """
+    Close shared connection pool of async database client
+    """
+    await close_supabase_async()
+
+@app.on_event("shutdown")
+def shutdown_rating_buffer():
+    """
+    Write buffered word ratings
+    """
+    rating_buffer.close()
+
+@app.on_event("shutdown")
+def shutdown_story_jobs():
+    """
+    Stop workers of story jobs
+    """
+    story_jobs.close()
+
+async def get_word_detail(word_id):
     """
     Return detail of word with translate
     
     :param word_id: Word ID
     """
-    return word_detail_with_translate(word_id, database_anon)
+    return await word_detail_with_translate(word_id)
 
 @app.get("/health", tags=["Health"])
 async def health_check():
@@ -48,35 +97,69 @@ async def health_check():
     """
     return {"status": "OK"}
 
-@app.get("/words/all/{language_from}/{language_to}", status_code=200, tags=["Word"], response_model=EnvelopeWordContentOut)
-async def get_all_words(language_from, language_to):
+@app.get("/health/cache", tags=["Health"])
+async def health_cache():
     """
-    Return all words with translate
+    Return counters of in-memory caches
     """
-    data_responce = get_all_words_with_translate(database_anon, language_from, language_to)
-    responce = {
+    return {
         "status": "OK",
-        "data": data_responce
-        }
-    return responce
+        "data": {"audio": audio_cache.stats(), "evaluation": evaluation_cache.stats(), "sentence_pool": sentence_pool.stats(), "word_snapshots": word_snapshots.stats(), "story_jobs": story_jobs.stats()}
+    }
+
+@app.post("/health/reference/refresh", tags=["Health"])
+def post_reference_refresh():
+    """
+    Reload reference tables (tenses, languages, topics) from database
+    """
+    reference_data.load(database_anon)
+    return {"status": "OK"}
+
+@app.get("/words/all/{language_from}/{language_to}", status_code=200, tags=["Word"], response_model=EnvelopeWordContentOut)
+async def get_all_words(language_from, language_to, after: str | None = None, limit: int | None = Query(default=None, ge=1, le=5000), format: str | None = None, accept: str | None = Header(default=None), accept_encoding: str | None = Header(default=None), if_none_match: str | None = Header(default=None)):
+    """
+    Return all words with translate, with after/limit page by word ID, with format=ndjson streamed line by line,
+    JSON or MessagePack (Accept: application/msgpack), whole list from precompressed snapshot with ETag
+    """
+    if format == "ndjson":
+        return StreamingResponse(ndjson_words(language_from, language_to, after), media_type="application/x-ndjson")
+    if after or limit:
+        data_responce, next_cursor = await get_words_page(language_from, language_to, after, limit or 500)
+        return encoded_response({
+            "status": "OK",
+            "data": data_responce,
+            "next_cursor": next_cursor
+            }, accept)
+    return await word_snapshots.response(language_from, language_to, accept, accept_encoding, if_none_match)
 
 @app.get("/word/detail/{word_id}", status_code=200, tags=["Word"], response_model=EnvelopeWordContentOut)
-async def get_word(word_id: str):
+async def get_word(word_id: str, accept: str | None = Header(default=None)):
     """
-    Return detail of word with translate
+    Return detail of word with translate, JSON or MessagePack (Accept: application/msgpack)
     """
-    word_detail = get_word_detail(word_id)
-    return {
+    word_detail = await get_word_detail(word_id)
+    return encoded_response({
         "status": "OK", 
         "data": word_detail
-    }
+    }, accept)
+
+@app.post("/word/detail/batch", status_code=200, tags=["Word"], response_model=EnvelopeWordContentOut)
+async def post_word_detail_batch(batch: WordDetailBatchIn, accept: str | None = Header(default=None)):
+    """
+    Return details of words with translate in order of request (max 500 IDs), JSON or MessagePack
+    """
+    words_detail = await words_detail_with_translate(batch.word_ids)
+    return encoded_response({
+        "status": "OK",
+        "data": words_detail
+    }, accept)
 
 @app.post("/word", status_code=201, tags=["Word"], response_model=EnvelopeWordContentOut)
 async def post_create_item(word: WordContentIn):
     """
     Create new word
     """
-    word_data = create_word(word, database_anon)
+    word_data = await create_word(word)
     return {
         "status": "OK", 
         "data": [ word_data ]
@@ -96,11 +179,11 @@ async def get_random_word(id_seed: int, word_language_from = "EN", word_language
         word_language_from = "EN"
     if not word_language_to:
         word_language_to = "CZ"
-    data = random_word(database_anon, id_seed, word_language_from, word_language_to)
+    data = await random_word(id_seed, word_language_from, word_language_to)
     return {"status": "OK", "data": data}
 
 @app.get("/word/speech/{word_id}", status_code=200, tags=["Word"]) #response_model=EnvelopeWordSpeechOut
-def get_word_speech(word_id):
+def get_word_speech(word_id, range: str | None = Header(default=None), if_none_match: str | None = Header(default=None), if_range: str | None = Header(default=None)):
     """
     Return word with Text-To-Speech
     
@@ -109,13 +192,18 @@ def get_word_speech(word_id):
     responce = word_speech(word_id, database_service, database_anon)
     if not responce:
         raise HTTPException(status_code=404, detail="Audio not found")
-    return StreamingResponse(
-        BytesIO(responce),
-        media_type="audio/mpeg",  # pro mp3
-        headers={"Content-Disposition": 'inline; filename="speech.mp3"'},
-    )
+    return audio_response(responce, range, if_none_match, if_range)
+@app.post("/word/speech/bundle", status_code=200, tags=["Word"])
+def post_word_speech_bundle(bundle: WordSpeechBundleIn):
+    """
+    Return Text-To-Speech of more words as multipart/mixed (max 50), missing audio in header X-Missing-Words
+    """
+    responce = words_speech(bundle.word_ids, database_service, database_anon)
+    if not any(audio for _, audio in responce):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return audio_bundle_response(responce)
 @app.get("/storytelling/speech/{story_id}", status_code=200, tags=["StoryTelling"]) #response_model=EnvelopeWordSpeechOut
-def get_story_speech(story_id):
+def get_story_speech(story_id, range: str | None = Header(default=None), if_none_match: str | None = Header(default=None), if_range: str | None = Header(default=None)):
     """
     Return story with Text-To-Speech
     
@@ -124,11 +212,7 @@ def get_story_speech(story_id):
     responce = story_speech(story_id, database_service, database_anon)
     if not responce:
         raise HTTPException(status_code=404, detail="Audio not found")
-    return StreamingResponse(
-        BytesIO(responce),
-        media_type="audio/mpeg",  # pro mp3
-        headers={"Content-Disposition": 'inline; filename="speech.mp3"'},
-    )
+    return audio_response(responce, range, if_none_match, if_range)
 
 @app.post("/word/rating/{word_translate_id}/{rating}", status_code=200, tags=["Word"], response_model=EnvelopeWordRating)
 def post_word_rating(word_translate_id: str, rating: float):
@@ -143,10 +227,10 @@ def get_word_languages():
     """
     Return all supported languages
     """
-    data = database_anon.from_("translate_all_languages").select("*").execute()
+    data = reference_data.get_languages(database_anon)
     return {
         "status:": "OK",
-        "data": data.data
+        "data": data
     }
 
 @app.post("/matching/rating", status_code=201, tags=["Matching"])
@@ -178,15 +262,55 @@ def get_storytelling_story(topic: StorytellingStoryByTopic):
         "status": "OK",
         "data": story
     }
+@app.post("/storytelling/story/stream", status_code=200, tags=["Storytelling"])
+async def post_storytelling_story_stream(topic: StorytellingStoryByTopic):
+    """
+    Server-sent events with title and text of story while it is generated, last event (done / error) contains saved story
+    """
+    return StreamingResponse(create_story_stream(database_anon, database_service, topic), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+@app.post("/storytelling/story/job", status_code=202, tags=["Storytelling"])
+def post_storytelling_story_job(topic: StorytellingStoryByTopic):
+    """
+    Queue story generation, result by job status or events
+    """
+    try:
+        job = story_jobs.submit(database_anon, database_service, topic)
+    except StoryJobsFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return {
+        "status": "OK",
+        "data": {"job_id": job.job_id, "status": job.status}
+    }
+@app.get("/storytelling/story/job/{job_id}", status_code=200, tags=["Storytelling"])
+def get_storytelling_story_job(job_id: str):
+    """
+    Return state of story job, with story when it is done
+    """
+    job = story_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "status": "OK",
+        "data": job.as_dict()
+    }
+@app.get("/storytelling/story/job/{job_id}/events", status_code=200, tags=["Storytelling"])
+async def get_storytelling_story_job_events(job_id: str):
+    """
+    Server-sent events of story job, last event (done / error) contains result
+    """
+    job = story_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(story_jobs.events(job), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 @app.post("/storytelling/evaluation", status_code=200, tags=["Storytelling"])
-def get_storytelling_evaluate_retelling(story: StorytellingEvaluationStory):
+async def get_storytelling_evaluate_retelling(story: StorytellingEvaluationStory):
     """
     Return evaluation from sendet text
     
     :param story: Original story with student text to evaluation
     :type story: StorytellingEvaluationStory
     """
-    feedback = evaluate_retelling(database_anon, story)
+    feedback = await evaluate_retelling(story)
     return {
         "status": "OK",
         "data": feedback
@@ -197,10 +321,11 @@ def get_statistics_daily():
     """
     Return statistics of using vodous for week
     """
-    data = database_anon.from_("matching_statistics_by_day").select("*").gte("date_serial", date.today()-timedelta(7)).execute()
+    data = weekly_statistics(database_anon)
+    # stejný tvar jako dřív (celá odpověď z databáze: data + count)
     return {
         "status": "OK",
-        "data": data
+        "data": {"data": data, "count": None}
     }
 
 @app.post("/sentence_check/sentence/random")
@@ -231,11 +356,13 @@ def get_all_tenses():
 
 # check sentence tense
 @app.post("/sentence_check/sentence/check")
-def post_sentense_check(check_answer: SentenceCheckAnswer):
+async def post_sentense_check(check_answer: SentenceCheckAnswer):
     """
     Check new sentence
     """
-    check_data = check_change_sentence(database_anon, check_answer.SourceSentence, check_answer.NewSentence, check_answer.TargetTense, check_answer.TargetTenseType)
+    check_data = precheck_sentence(check_answer)
+    if check_data is None:
+        check_data = await check_change_sentence(check_answer.SourceSentence, check_answer.NewSentence, check_answer.TargetTense, check_answer.TargetTenseType)
     return {
         "status": "OK",
         "data": check_data
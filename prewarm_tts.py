@@ -0,0 +1,142 @@
+"""
+Předgenerování TTS audia pro všechna slovíčka (python prewarm_tts.py)
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from supabase_client import supabase_anon as database_anon, supabase_service as database_service
+from app.Endpoint.bucket import supabase_get_bucket, supabase_file_exists, upload_file_to_bucket
+from app.Endpoint.word import word_download_from_openai, word_file_in_name_bucket
+
+BUCKET_SERVER = "words_tts"
+BUCKET_FOLDER = "mp3"
+
+
+def bucket_existing_files(bucket_id, storage_client_service, page_size=1000):
+    """
+    Return set of all file paths in folder of bucket
+
+    :param bucket_id: Bucket ID
+    :param storage_client_service: client to server
+    :param page_size: Files per one list request
+    """
+    files = set()
+    offset = 0
+    while True:
+        page = storage_client_service.storage.from_(bucket_id).list(BUCKET_FOLDER, {"limit": page_size, "offset": offset})
+        files.update(f"{BUCKET_FOLDER}/{item['name']}" for item in page)
+        if len(page) < page_size:
+            return files
+        offset += page_size
+
+
+def read_checkpoint(checkpoint_path):
+    """
+    Return last processed word ID from checkpoint file
+
+    :param checkpoint_path: Path of checkpoint file
+    """
+    if not os.path.exists(checkpoint_path):
+        return ""
+    with open(checkpoint_path, encoding="utf-8") as checkpoint_file:
+        return json.load(checkpoint_file).get("last_word_id", "")
+
+
+def write_checkpoint(checkpoint_path, last_word_id):
+    """
+    Save last processed word ID to checkpoint file
+
+    :param checkpoint_path: Path of checkpoint file
+    :param last_word_id: Last processed word ID
+    """
+    with open(checkpoint_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump({"last_word_id": last_word_id}, checkpoint_file)
+
+
+def word_pages(after_word_id, page_size):
+    """
+    Yield pages of words ordered by word_id (keyset pagination)
+
+    :param after_word_id: Start after this word ID
+    :param page_size: Words per page
+    """
+    while True:
+        querry = database_anon.from_("word_content").select("word_id,word_content,tts_path").order("word_id").limit(page_size)
+        if after_word_id:
+            querry = querry.gt("word_id", after_word_id)
+        page = querry.execute().data
+        if not page:
+            return
+        yield page
+        after_word_id = page[-1]["word_id"]
+
+
+def prewarm_word(word, bucket_id, existing_files, retries):
+    """
+    Synthesize and upload audio for one word when it is missing in bucket
+
+    :param word: Row of word_content
+    :param bucket_id: Bucket ID
+    :param existing_files: Paths of files in bucket
+    :param retries: Count of attempts for TTS and upload
+    :return: "exists", "created" or "failed"
+    """
+    tts_path = word_file_in_name_bucket(word["tts_path"], word["word_id"], database_anon)
+    if tts_path in existing_files:
+        return "exists"
+    for attempt in range(retries):
+        if attempt:
+            time.sleep(2 ** attempt)
+        word_tts = word_download_from_openai(word["word_content"])
+        if not word_tts:
+            continue
+        try:
+            upload_file_to_bucket(BUCKET_SERVER, tts_path, word_tts, database_service)
+            return "created"
+        except Exception:
+            # soubor mezitím mohl nahrát požadavek API
+            if supabase_file_exists(bucket_id, tts_path, database_service):
+                return "exists"
+    return "failed"
+
+
+def prewarm_tts(workers=4, retries=3, page_size=200, checkpoint_path=".prewarm_tts_checkpoint", restart=False):
+    """
+    Synthesize missing audio for all words, resumable by checkpoint file
+
+    :param workers: Count of parallel TTS requests
+    :param retries: Count of attempts for one word
+    :param page_size: Words per page
+    :param checkpoint_path: Path of checkpoint file
+    :param restart: Ignore checkpoint and start from first word
+    """
+    bucket = supabase_get_bucket(BUCKET_SERVER, database_service)
+    existing_files = bucket_existing_files(bucket.id, database_service)
+    after_word_id = "" if restart else read_checkpoint(checkpoint_path)
+    if after_word_id:
+        print(f"Resume after word {after_word_id}")
+    counts = {"exists": 0, "created": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for page in word_pages(after_word_id, page_size):
+            for result in executor.map(lambda word: prewarm_word(word, bucket.id, existing_files, retries), page):
+                counts[result] += 1
+            write_checkpoint(checkpoint_path, page[-1]["word_id"])
+            print(f"{sum(counts.values())} words, created {counts['created']}, exists {counts['exists']}, failed {counts['failed']}, last word {page[-1]['word_id']}", flush=True)
+    # dokončený běh - příští import slovíček se projde celý znovu
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate TTS audio for all words")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel TTS requests")
+    parser.add_argument("--retries", type=int, default=3, help="Attempts for one word")
+    parser.add_argument("--page-size", type=int, default=200, help="Words per page")
+    parser.add_argument("--checkpoint", default=".prewarm_tts_checkpoint", help="Checkpoint file for resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoint")
+    args = parser.parse_args()
+    result = prewarm_tts(args.workers, args.retries, args.page_size, args.checkpoint, args.restart)
+    print(f"Done: {result}")
@@ -1,8 +1,9 @@
 """
 Client pro supabase
 """
+import asyncio
 import os
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, Client, AsyncClient
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,3 +19,26 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 supabase_anon: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 supabase_service: Client = create_client(SUPABASE_URL, SECRET_ACCESS_KEY)
 
+# async klient se vytváří až v běžící smyčce, sdílí jedno HTTP spojení (pool) pro celý proces
+_supabase_anon_async: AsyncClient | None = None
+_supabase_anon_async_lock = asyncio.Lock()
+
+async def get_supabase_anon_async() -> AsyncClient:
+    """
+    Return shared async client (anon)
+    """
+    global _supabase_anon_async
+    if _supabase_anon_async is None:
+        async with _supabase_anon_async_lock:
+            if _supabase_anon_async is None:
+                _supabase_anon_async = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase_anon_async
+
+async def close_supabase_async():
+    """
+    Close connection pool of async client
+    """
+    global _supabase_anon_async
+    if _supabase_anon_async is not None:
+        await _supabase_anon_async.postgrest.aclose()
+        _supabase_anon_async = None
@@ -0,0 +1,158 @@
+"""
+Shared fixtures - fake database and storage clients, no connection to Supabase or OpenAI
+"""
+import os
+import sys
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+os.environ.setdefault("SECRET_ACCESS_KEY", "test")
+os.environ.setdefault("API_ACCESS_URL", "*")
+os.environ.setdefault("SENTENCE_POOL_TARGET", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+class FakeResponse():
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery():
+    """
+    Chainable query, filters eq/in_/gt/ilike, order and limit are applied to rows of table,
+    insert appends rows (with "<table>_id")
+    """
+    def __init__(self, database, table):
+        self.database = database
+        self.table = table
+        self.filters = []
+        self.inserted = None
+        self.order_by = None
+        self.limit_rows = None
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            if name in ("eq", "in_", "gt", "ilike"):
+                self.filters.append((name, args))
+            elif name == "order":
+                self.order_by = args[0]
+            elif name == "limit":
+                self.limit_rows = args[0]
+            return self
+        return method
+
+    def insert(self, data):
+        rows = data if isinstance(data, list) else [data]
+        self.inserted = [{f"{self.table}_id": f"{self.table}-{index}", **row}
+                         for index, row in enumerate(rows, len(self.database.tables.get(self.table, [])))]
+        return self
+
+    def _rows(self):
+        self.database.calls.append((self.table, list(self.filters)))
+        if self.inserted is not None:
+            self.database.tables.setdefault(self.table, []).extend(self.inserted)
+            return FakeResponse(self.inserted)
+        rows = self.database.tables.get(self.table, [])
+        for name, (column, value) in self.filters:
+            if name == "gt":
+                rows = [row for row in rows if row.get(column) > value]
+            elif name == "ilike":
+                rows = [row for row in rows if str(row.get(column)).lower() == value.lower()]
+            else:
+                values = value if name == "in_" else [value]
+                rows = [row for row in rows if row.get(column) in values]
+        if self.order_by:
+            rows = sorted(rows, key=lambda row: row.get(self.order_by))
+        if self.limit_rows:
+            rows = rows[:self.limit_rows]
+        return FakeResponse(rows)
+
+    def execute(self):
+        return self._rows()
+
+
+class FakeAsyncQuery(FakeQuery):
+    async def execute(self):
+        return self._rows()
+
+
+class FakeBucket():
+    id = "words_tts"
+
+
+class FakeStorage():
+    def __init__(self, files):
+        self.files = files
+        self.calls = []
+
+    def get_bucket(self, name):
+        return FakeBucket()
+
+    def from_(self, bucket_id):
+        return self
+
+    def exists(self, path):
+        self.calls.append(("exists", path))
+        return path in self.files
+
+    def download(self, path):
+        self.calls.append(("download", path))
+        return self.files[path]
+
+    def upload(self, path, file, file_options):
+        self.calls.append(("upload", path))
+        self.files[path] = file
+
+
+class FakeDatabase():
+    """
+    Sync client with tables as lists of rows and storage with files
+    """
+    query_class = FakeQuery
+
+    def __init__(self, tables=None, files=None):
+        self.tables = tables or {}
+        self.calls = []
+        self.storage = FakeStorage(files if files is not None else {})
+
+    def from_(self, table):
+        return self.query_class(self, table)
+
+
+class FakeAsyncDatabase(FakeDatabase):
+    query_class = FakeAsyncQuery
+
+
+@pytest.fixture
+def fake_database(monkeypatch):
+    """
+    Install fake sync and async database clients, return factory (tables, files) -> sync client
+    """
+    import main
+    import supabase_client
+    from app.Endpoint.vocabulary import vocabulary_store
+
+    def install(tables=None, files=None):
+        database = FakeDatabase(tables, files)
+        database_async = FakeAsyncDatabase(database.tables)
+        database_async.calls = database.calls
+        monkeypatch.setattr(main, "database_anon", database)
+        monkeypatch.setattr(main, "database_service", database)
+        monkeypatch.setattr(supabase_client, "_supabase_anon_async", database_async)
+        return database
+
+    vocabulary_store.invalidate()
+    yield install
+    vocabulary_store.invalidate()
+
+
+@pytest.fixture
+def client():
+    """
+    Test client of API without startup handlers
+    """
+    from fastapi.testclient import TestClient
+    import main
+    return TestClient(main.app)
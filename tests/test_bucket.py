@@ -0,0 +1,42 @@
+"""
+Upload of audio to bucket - race with other request vs. real failure
+"""
+import logging
+from app.Endpoint.bucket import upload_file_to_bucket_once
+from conftest import FakeDatabase
+
+
+class FailingStorage():
+    def __init__(self, files):
+        self.files = files
+
+    def from_(self, bucket_id):
+        return self
+
+    def upload(self, path, file, file_options):
+        raise Exception("upload failed")
+
+    def exists(self, path):
+        return path in self.files
+
+
+def test_upload_created():
+    database = FakeDatabase()
+    assert upload_file_to_bucket_once("words_tts", "words_tts", "mp3/a.mp3", b"A", database) is True
+    assert database.storage.files["mp3/a.mp3"] == b"A"
+
+
+def test_upload_already_exists_is_not_logged(caplog):
+    database = FakeDatabase()
+    database.storage = FailingStorage({"mp3/a.mp3": b"A"})
+    with caplog.at_level(logging.ERROR):
+        assert upload_file_to_bucket_once("words_tts", "words_tts", "mp3/a.mp3", b"A", database) is False
+    assert not caplog.records
+
+
+def test_upload_failure_is_logged(caplog):
+    database = FakeDatabase()
+    database.storage = FailingStorage({})
+    with caplog.at_level(logging.ERROR):
+        assert upload_file_to_bucket_once("words_tts", "words_tts", "mp3/a.mp3", b"A", database) is None
+    assert "mp3/a.mp3" in caplog.text
@@ -0,0 +1,62 @@
+"""
+Incremental extraction of title and text from streamed JSON
+"""
+import json
+import pytest
+from app.Endpoint.json_stream import JsonFieldExtractor
+from app.Endpoint.openAI_client import ReadingText
+
+
+def extract(document, chunk_size, fields=("title", "text")):
+    extractor = JsonFieldExtractor(fields)
+    result = {}
+    for start in range(0, len(document), chunk_size):
+        for field, text in extractor.feed(document[start:start + chunk_size]):
+            result[field] = result.get(field, "") + text
+    return result
+
+
+STORY = ReadingText(
+    level="B1",
+    title='The "Best" Day \\ ever 😀',
+    text="Line one.\nLine two\twith tab, slash / and emoji 🎉 and čeština.",
+    word_count=100,
+    vocab=["text", "title", '"text": "nested"'],
+    questions=['{"text": "not me"}', "Why?"],
+)
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64, 10000])
+def test_reading_text_fields(chunk_size, ensure_ascii):
+    document = json.dumps(STORY.model_dump(), ensure_ascii=ensure_ascii)
+    assert extract(document, chunk_size) == {"title": STORY.title, "text": STORY.text}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5, 6, 7])
+def test_surrogate_pair_split_across_chunks(chunk_size):
+    document = '{"title": "\\ud83d\\ude00 smile", "text": "a\\u00e9b"}'
+    assert extract(document, chunk_size) == {"title": "😀 smile", "text": "aéb"}
+
+
+def test_nested_keys_are_not_emitted():
+    document = json.dumps({
+        "level": "B1",
+        "questions": [{"text": "nested question"}],
+        "vocab": {"title": "nested vocab"},
+        "title": "Top",
+        "text": "Body",
+    })
+    assert extract(document, 3) == {"title": "Top", "text": "Body"}
+
+
+def test_value_equal_to_field_name_is_not_key():
+    document = json.dumps({"level": "text", "text": "Body", "word_count": 80})
+    assert extract(document, 2) == {"text": "Body"}
+
+
+def test_fragments_follow_stream():
+    extractor = JsonFieldExtractor(("text",))
+    assert extractor.feed('{"text": "Hel') == [("text", "Hel")]
+    assert extractor.feed('lo\\') == [("text", "lo")]
+    assert extractor.feed('n"}') == [("text", "\n")]
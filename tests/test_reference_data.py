@@ -0,0 +1,49 @@
+"""
+Registry of reference tables - concurrent reload and topics
+"""
+import threading
+import time
+from app.Endpoint.reference_data import ReferenceData
+from app.Endpoint import storytelling
+from conftest import FakeDatabase
+
+
+class SlowDatabase(FakeDatabase):
+    def __init__(self, tables):
+        super().__init__(tables)
+        self.loads = 0
+
+    def from_(self, table):
+        if table == "tense_check_tense":
+            self.loads += 1
+            time.sleep(0.05)
+        return super().from_(table)
+
+
+def test_expired_data_loaded_by_one_thread():
+    database = SlowDatabase({"tense_check_tense": [{"tense_check_tense_id": "past", "text_eng": "Past simple"}]})
+    reference_data = ReferenceData()
+    threads = [threading.Thread(target=reference_data.get_tenses, args=(database,)) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert database.loads == 1
+
+
+def test_random_topic_has_random_id():
+    database = FakeDatabase({"storytelling_topics": [{"storytelling_topics_id": "t1", "topic_text": "Rain", "created_at": None}]})
+    topic = ReferenceData().random_topic(database)
+    assert topic["storytelling_topics_id"] == "t1"
+    assert topic["random_id"]
+
+
+def test_new_topic_is_added_without_reload(monkeypatch):
+    database = SlowDatabase({"storytelling_topics": []})
+    reference_data = ReferenceData()
+    monkeypatch.setattr(storytelling, "reference_data", reference_data)
+    reference_data.get_tenses(database)
+    topic_id = storytelling.story_topic_id(database, "Snow")
+    assert database.loads == 1
+    assert reference_data.random_topic(database)["storytelling_topics_id"] == topic_id
+    assert database.loads == 1
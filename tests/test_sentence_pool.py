@@ -0,0 +1,82 @@
+"""
+Sentence pool - loading of existing sentences
+"""
+from app.Endpoint import sentence_pool as sentence_pool_module
+from app.Endpoint.sentence_pool import SentencePool
+from app.Endpoint.openAI_client import SentenceTaskResult
+from conftest import FakeDatabase
+
+
+def test_load_caps_buckets_at_target(monkeypatch):
+    tenses = [{"tense_check_tense_id": "past", "text_eng": "Past simple"}, {"tense_check_tense_id": "future", "text_eng": "Future simple"}]
+    monkeypatch.setattr(sentence_pool_module.reference_data, "get_tenses", lambda database: tenses)
+    rows = [
+        {"tense_check_sentence_id": f"s{index:04d}", "text_eng": f"Sentence {index}", "text_cz": f"Věta {index}", "tense_id": "past", "sentence_type": "Positive"}
+        for index in range(200)
+    ] + [{"tense_check_sentence_id": "q0001", "text_eng": "Question?", "text_cz": "Otázka?", "tense_id": "future", "sentence_type": "question"}]
+    database = FakeDatabase({"tense_check_all_sentence": rows})
+    pool = SentencePool(target=5, low_water=2)
+    pool.load(database)
+    stats = pool.stats()
+    assert stats["Past simple/positive"] == 5
+    assert stats["Future simple/question"] == 1
+    assert stats["Past simple/negative"] == 0
+
+
+class FakeSentenceClient():
+    def __init__(self):
+        self.calls = 0
+
+    def create_client(self):
+        pass
+
+    def get_sentence_with_parameters(self, tense, sentence_type):
+        self.calls += 1
+        return SentenceTaskResult.model_construct(sentence=f"Generated {self.calls}.", czech_translation="Vygenerováno.", sentence_type=sentence_type, tense=tense)
+
+
+def sentence_row(index, sentence_type="positive"):
+    return {"tense_check_sentence_id": f"s{index:04d}", "text_eng": f"Sentence {index}", "text_cz": f"Věta {index}", "tense_id": "past", "sentence_type": sentence_type}
+
+
+def refill_pool(monkeypatch, rows, target=5):
+    monkeypatch.setattr(sentence_pool_module.reference_data, "get_tenses", lambda database: [{"tense_check_tense_id": "past", "text_eng": "Past simple"}])
+    ai_client = FakeSentenceClient()
+    monkeypatch.setattr(sentence_pool_module, "openAIClient", lambda: ai_client)
+    database = FakeDatabase({"tense_check_all_sentence": [], "tense_check_sentence": rows})
+    pool = SentencePool(target=target, low_water=2)
+    return pool, database, ai_client
+
+
+def test_refill_uses_unserved_database_rows_first(monkeypatch):
+    pool, database, ai_client = refill_pool(monkeypatch, [sentence_row(index) for index in range(12)])
+    pool.refill(database)
+    assert pool.stats()["Past simple/positive"] == 5
+    served = [pool.take("past", "positive")["text_eng"] for _ in range(5)]
+    pool.refill(database)
+    served += [pool.take("past", "positive")["text_eng"] for _ in range(5)]
+    assert len(set(served)) == 10
+    # negative a question nemají v databázi nic, doplní je OpenAI jen jednou
+    assert ai_client.calls == 2 * 5
+
+
+def test_refill_calls_openai_only_for_shortfall(monkeypatch):
+    pool, database, ai_client = refill_pool(monkeypatch, [sentence_row(index) for index in range(3)] + [sentence_row(100 + index, "Negative") for index in range(5)] + [sentence_row(200 + index, "question") for index in range(5)])
+    pool.refill(database)
+    assert ai_client.calls == 2
+    texts = {pool.take("past", "positive")["text_eng"] for _ in range(5)}
+    assert {"Sentence 0", "Sentence 1", "Sentence 2"} <= texts
+
+
+def test_refill_picks_rows_inserted_before_cursor(monkeypatch):
+    rows = [sentence_row(index) for index in range(10, 15)]
+    pool, database, ai_client = refill_pool(monkeypatch, rows)
+    pool.refill(database)
+    for _ in range(5):
+        pool.take("past", "positive")
+    # věty uložené jiným procesem s menším ID
+    rows.extend(sentence_row(index) for index in range(5))
+    calls = ai_client.calls
+    pool.refill(database)
+    assert ai_client.calls == calls
+    assert {pool.take("past", "positive")["text_eng"] for _ in range(5)} == {f"Sentence {index}" for index in range(5)}
@@ -0,0 +1,84 @@
+"""
+Local precheck of sentence transformation (precheck_sentence)
+"""
+import pytest
+from app.Endpoint.sentence import precheck_sentence, sentence_words, sentence_has_type
+from app.Model.sentence import SentenceCheckAnswer
+
+
+def answer(source, student, sentence_type, tense="Past simple"):
+    return SentenceCheckAnswer(SourceSentence=source, NewSentence=student, TargetTense=tense, TargetTenseType=sentence_type)
+
+
+@pytest.mark.parametrize("student", [
+    "He didn't give up.",
+    "He didn’t give up.",
+    "He didn‘t give up.",
+    "He did not give up.",
+    "He never gave up.",
+    "He didnt give up.",
+    "He wont give up.",
+    "He doesnt give up.",
+])
+def test_negative_passes_to_openai(student):
+    assert precheck_sentence(answer("He gave up.", student, "NEGATIVE")) is None
+
+
+@pytest.mark.parametrize("sentence", [
+    "I won't go.", "I won’t go.", "I can't swim.", "I can’t swim.", "It isn't late.", "It isn’t late.", "I cannot swim.",
+    "I wont go", "I cant swim.", "It isnt late.", "They werent there.", "You shouldnt go.",
+])
+def test_contractions_are_negative(sentence):
+    assert sentence_has_type(sentence, "negative")
+    assert not sentence_has_type(sentence, "affirmative")
+
+
+def test_curly_apostrophe_words_equal_ascii():
+    assert sentence_words("She doesn’t know.") == sentence_words("She doesn't know.")
+
+
+def test_missing_negation():
+    feedback = precheck_sentence(answer("He gave up.", "He gave up quickly.", "NEGATIVE"))
+    assert feedback is not None
+    assert feedback.is_correct is False
+    assert feedback.errors[0].category == "sentence_type"
+
+
+def test_empty_sentence():
+    feedback = precheck_sentence(answer("He gave up.", "   ", "QUESTION"))
+    assert feedback.kept_meaning is False
+    assert feedback.errors[0].category == "meaning"
+
+
+def test_unchanged_sentence():
+    feedback = precheck_sentence(answer("He gave up.", "He  gave up.", "QUESTION"))
+    assert feedback.errors[0].problem == "Věta je stejná jako původní."
+
+
+def test_unchanged_sentence_with_curly_apostrophe():
+    feedback = precheck_sentence(answer("He didn't give up.", "He didn’t give up.", "QUESTION"))
+    assert feedback.errors[0].problem == "Věta je stejná jako původní."
+
+
+def test_unchanged_sentence_already_target_type():
+    assert precheck_sentence(answer("He didn’t give up.", "He didn't give up.", "NEGATIVE")) is None
+
+
+def test_question_without_question_mark():
+    feedback = precheck_sentence(answer("He gave up.", "Did he give up", "QUESTION"))
+    assert feedback.errors[0].category == "punctuation"
+
+
+def test_affirmative_written_as_question():
+    feedback = precheck_sentence(answer("He didn't give up.", "Did he give up?", "POSITIVE"))
+    assert feedback.errors[0].category == "sentence_type"
+    assert feedback.target_sentence_type == "affirmative"
+
+
+def test_correct_question_passes_to_openai():
+    assert precheck_sentence(answer("He gave up.", "Did he give up?", "QUESTION")) is None
+
+
+@pytest.mark.parametrize("sentence", ["I want it.", "Students went to the event.", "The ant is small."])
+def test_words_ending_with_nt_are_not_negation(sentence):
+    assert sentence_has_type(sentence, "affirmative")
@@ -0,0 +1,21 @@
+"""
+Story jobs - finished jobs are dropped after TTL
+"""
+import time
+from app.Endpoint.story_jobs import StoryJob, StoryJobs
+
+
+def test_expired_job_is_not_returned():
+    jobs = StoryJobs(workers=1, ttl_seconds=10)
+    job = StoryJob("job-1", "Rain")
+    job.status = "done"
+    job.finished_at = time.time() - 20
+    jobs._jobs[job.job_id] = job
+    running = StoryJob("job-2", "Snow")
+    jobs._jobs[running.job_id] = running
+    try:
+        assert jobs.get("job-1") is None
+        assert jobs.stats() == {"queued": 1}
+        assert jobs.get("job-2") is running
+    finally:
+        jobs.close()
@@ -0,0 +1,72 @@
+"""
+Saving of generated story - TTS uploads and insert of story
+"""
+import asyncio
+import time
+import pytest
+from app.Endpoint import storytelling
+from app.Endpoint.openAI_client import ReadingText
+from conftest import FakeDatabase
+
+STORY = ReadingText(level="B1", title="Rainy day", text="It rained all day.", word_count=100, vocab=["rain"] * 6, questions=["Why?"] * 2)
+
+
+class FakeAIClient():
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+
+    def create_client(self):
+        pass
+
+    def get_tts(self, text):
+        if text == self.fail_on:
+            raise Exception("TTS failed")
+        return b"mp3 " + text.encode("utf-8")
+
+
+def test_story_saved_after_tts():
+    database = FakeDatabase()
+    result = storytelling.story_persist(database, database, FakeAIClient(), STORY)
+    assert result["storytelling_story_id"] == database.tables["storytelling_story"][0]["storytelling_story_id"]
+    story_row = database.tables["storytelling_story"][0]
+    assert f"mp3/{story_row['story_text_tts_path']}.mp3" in database.storage.files
+    assert f"mp3/{story_row['story_title_tts_path']}.mp3" in database.storage.files
+
+
+def test_story_not_saved_when_tts_fails():
+    database = FakeDatabase()
+    with pytest.raises(Exception, match="TTS failed"):
+        storytelling.story_persist(database, database, FakeAIClient(fail_on=STORY.text), STORY)
+    assert not database.tables.get("storytelling_story")
+
+
+def test_background_tts_failure_is_logged(caplog):
+    database = FakeDatabase()
+    result = storytelling.story_persist(database, database, FakeAIClient(fail_on=STORY.title), STORY, wait_tts=False)
+    assert result["storytelling_story_id"]
+    for _ in range(100):
+        if "Background story TTS" in caplog.text:
+            break
+        time.sleep(0.01)
+    assert "Background story TTS" in caplog.text
+
+
+def test_stream_without_parsed_story_sends_error(monkeypatch):
+    from app.Endpoint.openAI_client import openAIAsyncClient
+    from app.Model.storytelling import StorytellingStoryByTopic
+
+    async def stream_story_by_topic(self, *args, **kwargs):
+        yield "delta", '{"title": "Half'
+        yield "story", None
+
+    monkeypatch.setattr(openAIAsyncClient, "create_client", lambda self: None)
+    monkeypatch.setattr(openAIAsyncClient, "stream_story_by_topic", stream_story_by_topic)
+    database = FakeDatabase()
+
+    async def collect():
+        return [event async for event in storytelling.create_story_stream(database, database, StorytellingStoryByTopic(topic="rain", tense="PAST"))]
+
+    events = asyncio.run(collect())
+    assert events[0].startswith("event: title")
+    assert events[-1] == 'event: error\ndata: {"detail": "Story was not generated, try again"}\n\n'
+    assert not database.tables.get("storytelling_story")
@@ -0,0 +1,73 @@
+"""
+Vocabulary cache - merge of rows and success rate updates from ratings
+"""
+import asyncio
+import threading
+from app.Endpoint import vocabulary
+from app.Endpoint.vocabulary import VocabularyPair, VocabularyStore
+
+
+def view_row(index, success_rate=0.5):
+    return {
+        "word_translate_id": f"t{index:05d}",
+        "word_id_from": f"w{index:05d}",
+        "word_content_from": "dog",
+        "word_language_from": "EN",
+        "valid_from": True,
+        "translate_success_rate": success_rate,
+        "translate_created_at": "2026-01-01T00:00:00+00:00",
+        "word_id_to": f"x{index:05d}",
+        "word_content_to": "pes",
+        "word_language_to": "CZ",
+        "valid_to": True,
+    }
+
+
+def test_ratings_do_not_drop_merged_records():
+    pair = VocabularyPair()
+    pair.merge([view_row(0)])
+    stop = threading.Event()
+
+    def rate():
+        while not stop.is_set():
+            pair.update_success_rates({"t00000": 0.1})
+            pair.update_success_rates({"t00000": 0.9})
+
+    thread = threading.Thread(target=rate)
+    thread.start()
+    try:
+        for index in range(1, 2000):
+            pair.merge([view_row(index)])
+    finally:
+        stop.set()
+        thread.join()
+    assert len(pair.ordered) == 2000
+    assert [record.word_translate_id for record in pair.ordered] == sorted(pair.records)
+
+
+def test_success_rates_are_reread_periodically(monkeypatch):
+    rates = {"t00000": 0.5}
+    calls = []
+
+    async def select_rows(table, columns="*", eq=None, or_=None, **kwargs):
+        calls.append(columns)
+        if columns == "*":
+            return [] if or_ else [view_row(0, rates["t00000"])]
+        return [{"word_translate_id": "t00000", "translate_success_rate": rates["t00000"]}]
+
+    monkeypatch.setattr(vocabulary, "select_rows", select_rows)
+    monkeypatch.setattr(vocabulary, "VOCABULARY_RATES_REFRESH_SECONDS", 0)
+    store = VocabularyStore(refresh_seconds=0)
+
+    async def run():
+        pair = await store.get_pair("EN", "CZ")
+        rating_version = pair.rating_version
+        # hodnocení zpracované jiným procesem
+        rates["t00000"] = 0.0
+        pair = await store.get_pair("EN", "CZ")
+        return pair, rating_version
+
+    pair, rating_version = asyncio.run(run())
+    assert pair.records["t00000"].translate_success_rate == 0.0
+    assert pair.rating_version != rating_version
+    assert "word_translate_id,translate_success_rate" in calls
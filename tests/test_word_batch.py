@@ -0,0 +1,69 @@
+"""
+Request tests of batch endpoints POST /word/detail/batch and POST /word/speech/bundle
+"""
+
+
+def view_row(word_id, translate_id, word_id_to):
+    return {
+        "word_translate_id": translate_id,
+        "word_id_from": word_id,
+        "word_content_from": f"word {word_id}",
+        "word_language_from": "EN",
+        "valid_from": True,
+        "note_from": None,
+        "word_id_to": word_id_to,
+        "word_content_to": f"slovo {word_id_to}",
+        "word_language_to": "CZ",
+        "valid_to": True,
+        "note_to": None,
+    }
+
+
+def test_detail_batch_in_request_order(fake_database, client):
+    fake_database({"words_all_with_translate": [
+        view_row("w1", "t1", "x1"),
+        view_row("w1", "t2", "x2"),
+        view_row("w2", "t3", "x3"),
+    ]})
+    response = client.post("/word/detail/batch", json={"word_ids": ["w2", "missing", "w1"]})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [word["word_id"] for word in data] == ["w2", "w1"]
+    assert [translate["word_id"] for translate in data[1]["translate"]] == ["x1", "x2"]
+
+
+def test_detail_batch_validation(fake_database, client):
+    fake_database()
+    assert client.post("/word/detail/batch", json={"word_ids": []}).status_code == 422
+    assert client.post("/word/detail/batch", json={"word_ids": ["w"] * 501}).status_code == 422
+
+
+def test_speech_bundle_multipart(fake_database, client):
+    fake_database(
+        {"word_content": [
+            {"word_id": "bundle-1", "word_content": "dog", "tts_path": "mp3/bundle-1.mp3"},
+            {"word_id": "bundle-2", "word_content": "cat", "tts_path": "mp3/bundle-2.mp3"},
+        ]},
+        {"mp3/bundle-1.mp3": b"AUDIO-1", "mp3/bundle-2.mp3": b"AUDIO-22"},
+    )
+    response = client.post("/word/speech/bundle", json={"word_ids": ["bundle-2", "bundle-9", "bundle-1"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("multipart/mixed; boundary=")
+    assert response.headers["x-missing-words"] == "bundle-9"
+    body = response.content
+    assert body.index(b"AUDIO-22") < body.index(b"AUDIO-1")
+    assert b'name="bundle-2"' in body
+
+
+def test_speech_bundle_not_found(fake_database, client):
+    fake_database({"word_content": []})
+    assert client.post("/word/speech/bundle", json={"word_ids": ["nothing"]}).status_code == 404
+
+
+def test_detail_batch_chunks_ids(fake_database, client):
+    database = fake_database({"words_all_with_translate": [view_row(f"w{index:03d}", f"t{index}", f"x{index}") for index in range(250)]})
+    word_ids = [f"w{index:03d}" for index in reversed(range(250))]
+    response = client.post("/word/detail/batch", json={"word_ids": word_ids})
+    assert [word["word_id"] for word in response.json()["data"]] == word_ids
+    in_sizes = [len(filters[0][1][1]) for table, filters in database.calls if table == "words_all_with_translate"]
+    assert in_sizes == [100, 100, 50]